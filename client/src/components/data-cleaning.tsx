@@ -136,6 +136,16 @@ export default function DataCleaning({ fileData, processedData, cleaningOptions,
     });
   };
 
+  const updateDeduplicationOptions = (key: keyof typeof cleaningOptions.deduplication, value: any) => {
+    onCleaningOptionsChanged({
+      ...cleaningOptions,
+      deduplication: {
+        ...cleaningOptions.deduplication,
+        [key]: value,
+      },
+    });
+  };
+
   const updateFilterOptions = (key: keyof typeof cleaningOptions.filtering, value: any) => {
     onCleaningOptionsChanged({
       ...cleaningOptions,
@@ -326,6 +336,61 @@ export default function DataCleaning({ fileData, processedData, cleaningOptions,
           </div>
         </div>
         
+        {/* Duplicate Removal */}
+        <div>
+          <h3 className="font-medium text-gray-900 mb-3">Duplicate Rows</h3>
+          <div className="space-y-3">
+            <div className="flex items-center space-x-2">
+              <Checkbox
+                id="enable-deduplication"
+                checked={cleaningOptions.deduplication.enabled}
+                onCheckedChange={(checked) => updateDeduplicationOptions('enabled', checked)}
+              />
+              <Label htmlFor="enable-deduplication" className="text-sm text-gray-700">Remove duplicate rows</Label>
+            </div>
+            
+            <div className="ml-6 space-y-2">
+              <Select
+                value={cleaningOptions.deduplication.columns[0] || '__all__'}
+                onValueChange={(value) => updateDeduplicationOptions('columns', value === '__all__' ? [] : [value])}
+                disabled={!cleaningOptions.deduplication.enabled}
+              >
+                <SelectTrigger>
+                  <SelectValue placeholder="Compare on column" />
+                </SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="__all__">All columns</SelectItem>
+                  {columns.map((column) => (
+                    <SelectItem key={column} value={column}>{column}</SelectItem>
+                  ))}
+                </SelectContent>
+              </Select>
+              <Select
+                value={cleaningOptions.deduplication.keep}
+                onValueChange={(value) => updateDeduplicationOptions('keep', value)}
+                disabled={!cleaningOptions.deduplication.enabled}
+              >
+                <SelectTrigger>
+                  <SelectValue />
+                </SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="first">Keep first occurrence</SelectItem>
+                  <SelectItem value="last">Keep last occurrence</SelectItem>
+                </SelectContent>
+              </Select>
+              <div className="flex items-center space-x-2">
+                <Checkbox
+                  id="dedup-ignore-case"
+                  checked={cleaningOptions.deduplication.ignoreCase}
+                  onCheckedChange={(checked) => updateDeduplicationOptions('ignoreCase', checked)}
+                  disabled={!cleaningOptions.deduplication.enabled}
+                />
+                <Label htmlFor="dedup-ignore-case" className="text-sm text-gray-600">Ignore case when comparing</Label>
+              </div>
+            </div>
+          </div>
+        </div>
+        
         {/* Row Filtering */}
         <div>
           <h3 className="font-medium text-gray-900 mb-3">Row Filtering</h3>
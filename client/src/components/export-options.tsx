@@ -1,5 +1,5 @@
 import { useState } from "react";
-import { FileText, FileSpreadsheet, FileCode, Download } from "lucide-react";
+import { FileText, FileSpreadsheet, FileCode, Database, Download } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Checkbox } from "@/components/ui/checkbox";
 import { Label } from "@/components/ui/label";
@@ -111,6 +111,16 @@ export default function ExportOptions({ fileData }: ExportOptionsProps) {
           Export as JSON
         </Button>
         
+        <Button
+          onClick={() => handleExport('sqlite')}
+          disabled={!fileData || exportMutation.isPending}
+          variant="outline"
+          className="w-full"
+        >
+          <Database size={16} className="mr-2" />
+          Export as SQLite
+        </Button>
+        
         <div className="pt-4 border-t border-gray-200">
           <h4 className="font-medium text-gray-900 mb-2">Export Settings</h4>
           <div className="space-y-2">
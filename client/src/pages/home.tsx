@@ -72,6 +72,31 @@ export default function Home() {
       removePunctuation: false,
       specificColumns: [],
     },
+    dateNormalization: {
+      enabled: false,
+      columns: [],
+      dayFirst: false,
+      invalidValues: 'keep',
+    },
+    categoryNormalization: {
+      enabled: false,
+      columns: [],
+      similarity: 0.85,
+      timeBudgetSeconds: 30,
+    },
+    deduplication: {
+      enabled: false,
+      columns: [],
+      keep: 'first',
+      ignoreCase: false,
+      memoryBudgetMb: 64,
+    },
+    outliers: {
+      enabled: false,
+      method: 'iqr',
+      strategy: 'flag',
+      columns: [],
+    },
     filtering: {
       removeEmptyRows: false,
       columnFilter: {
@@ -110,6 +135,31 @@ export default function Home() {
         removePunctuation: false,
         specificColumns: [],
       },
+      dateNormalization: {
+        enabled: false,
+        columns: [],
+        dayFirst: false,
+        invalidValues: 'keep',
+      },
+      categoryNormalization: {
+        enabled: false,
+        columns: [],
+        similarity: 0.85,
+        timeBudgetSeconds: 30,
+      },
+      deduplication: {
+        enabled: false,
+        columns: [],
+        keep: 'first',
+        ignoreCase: false,
+        memoryBudgetMb: 64,
+      },
+      outliers: {
+        enabled: false,
+        method: 'iqr',
+        strategy: 'flag',
+        columns: [],
+      },
       filtering: {
         removeEmptyRows: false,
         columnFilter: {
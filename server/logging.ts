@@ -0,0 +1,22 @@
+// Structured one-line JSON logs with size-capped string fields, so
+// processor output can be logged without flooding the log with datasets.
+
+const MAX_FIELD_CHARS = parseInt(process.env.LOG_MAX_FIELD_CHARS || "2000", 10);
+
+export function truncate(text: string, maxChars = MAX_FIELD_CHARS): string {
+  if (text.length <= maxChars) return text;
+  return `${text.slice(0, maxChars)}…[+${text.length - maxChars} chars]`;
+}
+
+export function logEvent(event: string, fields: Record<string, unknown> = {}, level: "info" | "error" = "info"): void {
+  const entry: Record<string, unknown> = { time: new Date().toISOString(), level, event };
+  for (const [key, value] of Object.entries(fields)) {
+    entry[key] = typeof value === "string" ? truncate(value) : value;
+  }
+  const line = JSON.stringify(entry);
+  if (level === "error") {
+    console.error(line);
+  } else {
+    console.log(line);
+  }
+}
@@ -0,0 +1,203 @@
+// In-process metrics for the processing tier, rendered in the Prometheus
+// text exposition format by GET /api/metrics.
+
+type Labels = Record<string, string>;
+
+function escapeLabelValue(value: string): string {
+  return value.replace(/\\/g, "\\\\").replace(/"/g, '\\"').replace(/\n/g, "\\n");
+}
+
+function formatLabels(labels: Labels): string {
+  const keys = Object.keys(labels).sort();
+  if (keys.length === 0) return "";
+  return `{${keys.map((key) => `${key}="${escapeLabelValue(labels[key])}"`).join(",")}}`;
+}
+
+function formatValue(value: number): string {
+  if (value === Infinity) return "+Inf";
+  if (value === -Infinity) return "-Inf";
+  return String(value);
+}
+
+interface Metric {
+  render(): string[];
+}
+
+export class Counter implements Metric {
+  private values = new Map<string, number>();
+
+  constructor(readonly name: string, readonly help: string) {}
+
+  inc(labels: Labels = {}, value = 1): void {
+    const key = formatLabels(labels);
+    this.values.set(key, (this.values.get(key) ?? 0) + value);
+  }
+
+  render(): string[] {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} counter`];
+    this.values.forEach((value, key) => lines.push(`${this.name}${key} ${formatValue(value)}`));
+    return lines;
+  }
+}
+
+export class Gauge implements Metric {
+  private values = new Map<string, number>();
+
+  constructor(readonly name: string, readonly help: string) {}
+
+  set(labels: Labels, value: number): void {
+    this.values.set(formatLabels(labels), value);
+  }
+
+  inc(labels: Labels = {}, value = 1): void {
+    const key = formatLabels(labels);
+    this.values.set(key, (this.values.get(key) ?? 0) + value);
+  }
+
+  dec(labels: Labels = {}, value = 1): void {
+    this.inc(labels, -value);
+  }
+
+  // Keep the largest value seen, e.g. a peak since process start
+  setMax(labels: Labels, value: number): void {
+    const key = formatLabels(labels);
+    this.values.set(key, Math.max(this.values.get(key) ?? -Infinity, value));
+  }
+
+  render(): string[] {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} gauge`];
+    this.values.forEach((value, key) => lines.push(`${this.name}${key} ${formatValue(value)}`));
+    return lines;
+  }
+}
+
+interface HistogramSeries {
+  labels: Labels;
+  counts: number[];
+  sum: number;
+  count: number;
+}
+
+export class Histogram implements Metric {
+  private series = new Map<string, HistogramSeries>();
+
+  constructor(readonly name: string, readonly help: string, readonly buckets: number[]) {}
+
+  observe(labels: Labels, value: number): void {
+    const key = formatLabels(labels);
+    let series = this.series.get(key);
+    if (!series) {
+      series = { labels, counts: this.buckets.map(() => 0), sum: 0, count: 0 };
+      this.series.set(key, series);
+    }
+    // Counts are stored per bucket and made cumulative when rendered
+    const index = this.buckets.findIndex((bound) => value <= bound);
+    if (index >= 0) series.counts[index]++;
+    series.sum += value;
+    series.count++;
+  }
+
+  render(): string[] {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} histogram`];
+    this.series.forEach((series, key) => {
+      let cumulative = 0;
+      this.buckets.forEach((bound, i) => {
+        cumulative += series.counts[i];
+        lines.push(`${this.name}_bucket${formatLabels({ ...series.labels, le: formatValue(bound) })} ${cumulative}`);
+      });
+      lines.push(`${this.name}_bucket${formatLabels({ ...series.labels, le: "+Inf" })} ${series.count}`);
+      lines.push(`${this.name}_sum${key} ${formatValue(series.sum)}`);
+      lines.push(`${this.name}_count${key} ${series.count}`);
+    });
+    return lines;
+  }
+}
+
+// Buckets growing by a constant factor, e.g. exponentialBuckets(1024, 4, 8)
+export function exponentialBuckets(start: number, factor: number, count: number): number[] {
+  return Array.from({ length: count }, (_, i) => start * Math.pow(factor, i));
+}
+
+export class MetricsRegistry {
+  private metrics: Metric[] = [];
+
+  register<T extends Metric>(metric: T): T {
+    this.metrics.push(metric);
+    return metric;
+  }
+
+  render(): string {
+    return this.metrics.map((metric) => metric.render().join("\n")).join("\n") + "\n";
+  }
+}
+
+export const registry = new MetricsRegistry();
+
+export const processorMetrics = {
+  duration: registry.register(new Histogram(
+    "csv_processor_duration_seconds",
+    "Wall time of Python processor runs by operation and status",
+    [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300],
+  )),
+  queueWait: registry.register(new Histogram(
+    "csv_processor_queue_wait_seconds",
+    "Time spent waiting for a free processor slot",
+    [0.001, 0.01, 0.1, 0.5, 1, 5, 15, 60],
+  )),
+  inputBytes: registry.register(new Histogram(
+    "csv_processor_input_bytes",
+    "Size of the CSV file handed to the processor",
+    exponentialBuckets(1024, 4, 10),
+  )),
+  outputBytes: registry.register(new Counter(
+    "csv_processor_output_bytes_total",
+    "Bytes read from processor stdout",
+  )),
+  rows: registry.register(new Histogram(
+    "csv_processor_rows",
+    "Rows in the processor result",
+    exponentialBuckets(10, 4, 10),
+  )),
+  queueDepth: registry.register(new Gauge(
+    "csv_processor_queue_depth",
+    "Requests waiting for a free processor slot",
+  )),
+  activeProcesses: registry.register(new Gauge(
+    "csv_processor_active_subprocesses",
+    "Python processor subprocesses currently running",
+  )),
+  failures: registry.register(new Counter(
+    "csv_processor_failures_total",
+    "Failed processor runs by operation and cause",
+  )),
+  workerPeakRss: registry.register(new Histogram(
+    "csv_processor_worker_peak_rss_bytes",
+    "Peak resident memory of each processor run",
+    exponentialBuckets(16 * 1024 * 1024, 2, 9),
+  )),
+  workerPeakRssMax: registry.register(new Gauge(
+    "csv_processor_worker_peak_rss_max_bytes",
+    "Largest processor peak resident memory since server start",
+  )),
+};
+
+processorMetrics.queueDepth.set({}, 0);
+processorMetrics.activeProcesses.set({}, 0);
+
+export const serverMetrics = {
+  residentMemory: registry.register(new Gauge(
+    "process_resident_memory_bytes",
+    "Resident memory of the Node server process",
+  )),
+  heapUsed: registry.register(new Gauge(
+    "nodejs_heap_used_bytes",
+    "V8 heap in use by the Node server process",
+  )),
+};
+
+// Refresh point-in-time server gauges; called before each scrape
+export function collectServerMetrics(): void {
+  const usage = process.memoryUsage();
+  serverMetrics.residentMemory.set({}, usage.rss);
+  serverMetrics.heapUsed.set({}, usage.heapUsed);
+}
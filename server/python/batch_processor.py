@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Apply one cleaning config to many CSV files in parallel.
+
+Usage:
+    python batch_processor.py <directory-or-glob> --options options.json --output-dir out/
+        [--workers N] [--force]
+
+The options file uses the same shape as the export operation:
+    {"format": "csv", "includeHeaders": true, "cleaningOptions": {...}, "jsonConfig": {...},
+     "sort": [{"column": "...", "direction": "asc"}]}
+
+Each run writes <output-dir>/batch_report.json with per-file status,
+timing and cleaning report. Outputs mirror the input paths below their
+common directory. Files whose content and config are unchanged since the
+last successful run are skipped and keep their previous report.
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from simple_csv_processor import detect_column_types, run_cleaning_pipeline, sort_rows, write_export, write_sqlite_export
+
+MANIFEST_NAME = '.batch_manifest.json'
+REPORT_NAME = 'batch_report.json'
+
+
+def find_input_files(source):
+    """Resolve a directory or glob pattern to a sorted list of CSV paths"""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, '*.csv')
+    else:
+        pattern = source
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def hash_file(path):
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_config(options):
+    """Stable hash of the options so config changes invalidate prior runs"""
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def output_path_for(input_path, output_dir, format_type, input_root):
+    """Output file path for an input file, mirroring its path below input_root.
+    
+    Inputs with the same name in different directories (e.g. drops/*/x.csv)
+    therefore get distinct outputs.
+    """
+    relative = os.path.relpath(os.path.abspath(input_path), input_root)
+    base = os.path.splitext(relative)[0]
+    return os.path.join(output_dir, f"{base}_cleaned.{format_type}")
+
+
+def process_file(input_path, options, output_path):
+    """Clean and export a single file; runs inside a worker process"""
+    start = time.perf_counter()
+    # Per-process temp name so two runs writing the same output never share it
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(input_path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            headers = next(reader, None)
+            if headers is None:
+                raise Exception("File is empty (no header row)")
+            rows = list(reader)
+
+        rows, headers, cleaning_report = run_cleaning_pipeline(
+            rows, headers, options.get('cleaningOptions') or {}, options.get('jsonConfig')
+        )
+        format_type = options.get('format', 'csv')
+        column_types = detect_column_types(rows, headers) if format_type == 'sqlite' else None
+        if options.get('sort'):
+            rows = sort_rows(rows, headers, options['sort'], options.get('sortMemoryBudgetMb', 256))
+
+        # Write to a temp file first so a failed run never leaves a partial output
+        if format_type == 'sqlite':
+            write_sqlite_export(rows, headers, tmp_path, column_types,
+                                options.get('sqliteTable', 'data'), options.get('sqliteIndexes'))
+        else:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as out:
+                write_export(rows, headers, format_type, options.get('includeHeaders', True), out)
+        os.replace(tmp_path, output_path)
+
+        return {
+            'status': 'success',
+            'output': output_path,
+            'cleaningReport': cleaning_report,
+            'seconds': time.perf_counter() - start,
+        }
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return {
+            'status': 'failed',
+            'error': str(e),
+            'seconds': time.perf_counter() - start,
+        }
+
+
+def load_manifest(output_dir):
+    """Load the record of previously processed files"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json(path, data):
+    """Atomically write a JSON document"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_batch(source, options, output_dir, workers=None, force=False):
+    """Process every matching file and return the aggregated run report"""
+    os.makedirs(output_dir, exist_ok=True)
+    format_type = options.get('format', 'csv')
+    config_hash = hash_config(options)
+    manifest = load_manifest(output_dir)
+    started_at = datetime.now(timezone.utc).isoformat()
+    run_start = time.perf_counter()
+
+    input_paths = find_input_files(source)
+    input_root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in input_paths]) if input_paths else ''
+    files = {}
+    pending = []
+    for input_path in input_paths:
+        key = os.path.abspath(input_path)
+        entry = {'file': input_path, 'contentHash': None}
+        files[key] = entry
+        try:
+            entry['contentHash'] = hash_file(input_path)
+        except OSError as e:
+            entry.update({'status': 'failed', 'error': str(e), 'seconds': 0})
+            continue
+
+        output_path = output_path_for(input_path, output_dir, format_type, input_root)
+        previous = manifest.get(key)
+        # Entries without a saved report are reprocessed so the run report stays complete
+        if (not force and previous
+                and previous.get('contentHash') == entry['contentHash']
+                and previous.get('configHash') == config_hash
+                and previous.get('output') == output_path
+                and os.path.exists(output_path)
+                and 'cleaningReport' in previous):
+            entry.update({
+                'status': 'skipped',
+                'output': previous['output'],
+                'cleaningReport': previous['cleaningReport'],
+                'seconds': 0,
+            })
+            continue
+        pending.append((key, input_path, output_path))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_file, input_path, options, output_path): key
+            for key, input_path, output_path in pending
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Worker crashed (e.g. killed); isolate the failure to this file
+                result = {'status': 'failed', 'error': f"Worker failed: {e}", 'seconds': 0}
+            files[key].update(result)
+            if result['status'] == 'success':
+                manifest[key] = {
+                    'contentHash': files[key]['contentHash'],
+                    'configHash': config_hash,
+                    'output': result['output'],
+                    'cleaningReport': result['cleaningReport'],
+                }
+
+    save_json(os.path.join(output_dir, MANIFEST_NAME), manifest)
+
+    results = list(files.values())
+    report = {
+        'startedAt': started_at,
+        'source': source,
+        'outputDir': output_dir,
+        'configHash': config_hash,
+        'totals': {
+            'files': len(results),
+            'succeeded': sum(1 for r in results if r['status'] == 'success'),
+            'skipped': sum(1 for r in results if r['status'] == 'skipped'),
+            'failed': sum(1 for r in results if r['status'] == 'failed'),
+            'seconds': time.perf_counter() - run_start,
+        },
+        'files': results,
+    }
+    save_json(os.path.join(output_dir, REPORT_NAME), report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply one cleaning config to many CSV files")
+    parser.add_argument('source', help="Directory of CSV files or a glob pattern")
+    parser.add_argument('--options', required=True, help="JSON file with export/cleaning options")
+    parser.add_argument('--output-dir', required=True, help="Directory for cleaned files and the run report")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Reprocess files even if unchanged")
+    args = parser.parse_args()
+
+    with open(args.options, 'r', encoding='utf-8') as f:
+        options = json.load(f)
+
+    report = run_batch(args.source, options, args.output_dir, args.workers, args.force)
+    totals = report['totals']
+    print(json.dumps(totals))
+    sys.exit(1 if totals['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
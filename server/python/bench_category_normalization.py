@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark category normalization and check which values it merges.
+
+Builds a text column of misspelled and reformatted city names plus
+unique identifiers, runs the normalization stage, and reports the time
+and the number of merged values. A fixed set of values that must never be
+merged (reordered numbers, JSON, dates, e-mail addresses) and values that
+must be merged is also checked, and the run fails if either is violated.
+
+Usage: python bench_category_normalization.py [distinct-values]
+"""
+import random
+import sys
+import time
+
+from simple_csv_processor import normalize_categories
+
+CITIES = ['New York', 'San Francisco', 'Los Angeles', 'Chicago', 'Philadelphia',
+          'San Antonio', 'Minneapolis', 'Indianapolis', 'Jacksonville', 'Sacramento']
+
+# Pairs that differ only in the order of their numbers or structured content
+KEEP_APART = [
+    ('2024-03-01', '2024-01-03'),
+    ('03/01/2024', '01/03/2024'),
+    ('{"x": 2, "y": 1}', '{"x": 1, "y": 2}'),
+    ('["a", "b"]', '["b", "a"]'),
+    ('3 Main St Apt 12', '12 Main St Apt 3'),
+    ('2-1', '1-2'),
+    ('2-1', '21'),
+    ('1-23', '12-3'),
+    ('john.smith@example.com', 'smith.john@example.com'),
+    ('Route 66', 'Route 67'),
+]
+
+# Variants expected to collapse onto the first (most frequent) spelling
+MERGE = [
+    ('New York', 'new york', 'York, New', 'New-York', 'NewYork'),
+    ('San Francisco', 'San Fransisco', 'san francisco '),
+    ('Apt 12 Main St', 'apt 12 main st.'),
+]
+
+
+def misspell(rng, value):
+    """Swap, drop or double one letter of a value"""
+    i = rng.randrange(1, len(value) - 1)
+    edit = rng.choice(['swap', 'drop', 'double'])
+    if edit == 'swap':
+        return value[:i] + value[i + 1] + value[i] + value[i + 2:]
+    if edit == 'drop':
+        return value[:i] + value[i + 1:]
+    return value[:i] + value[i] + value[i:]
+
+
+def check_cases():
+    """Return the number of fixed cases the stage gets wrong"""
+    failures = 0
+    rows = []
+    for pair in KEEP_APART:
+        rows.extend([[pair[0]], [pair[0]], [pair[1]]])
+    for group in MERGE:
+        rows.extend([[group[0]]] * len(group))
+        rows.extend([variant] for variant in group[1:])
+
+    original = [row[0] for row in rows]
+    normalized, _ = normalize_categories(rows, ['value'], {'enabled': True})
+    mapping = dict(zip(original, (row[0] for row in normalized)))
+
+    for pair in KEEP_APART:
+        for value in pair:
+            if mapping[value] != value:
+                failures += 1
+                print(f"MERGED: {value!r} -> {mapping[value]!r}")
+    for group in MERGE:
+        for variant in group[1:]:
+            if mapping[variant] != group[0]:
+                failures += 1
+                print(f"NOT MERGED: {variant!r} -> {mapping[variant]!r}")
+    return failures
+
+
+def main():
+    distinct = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(42)
+
+    rows = []
+    for city in CITIES:
+        rows.extend([[city]] * 50)
+        rows.extend([misspell(rng, city)] for _ in range(5))
+    # Unique identifiers make up most of the distinct values, as in real exports
+    rows.extend([f"ORD-{rng.randrange(10**9):09d}"] for _ in range(distinct))
+
+    start = time.perf_counter()
+    normalized, report = normalize_categories(rows, ['value'], {'enabled': True})
+    seconds = time.perf_counter() - start
+    merged = sum(1 for before, after in zip(rows, normalized) if before[0] != after[0])
+
+    print(f"Distinct values: {len({row[0] for row in rows}):,}, rows: {len(rows):,}")
+    print(f"Normalized in {seconds:.2f}s, {merged:,} cells rewritten")
+
+    failures = check_cases()
+    print(f"Fixed cases: {len(KEEP_APART)} kept apart, {len(MERGE)} merge groups, {failures} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
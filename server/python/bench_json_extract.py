@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark selective JSON field extraction against full per-cell parsing.
+
+Builds JSON columns of several payload sizes and shapes, flattens two
+fields with the targeted scanner on and off, and reports time per cell.
+Outputs are compared row by row, the scanner is also checked against a
+set of malformed cells, and the run fails if anything differs.
+
+Shapes:
+  event   - wanted keys first, then nested context objects (typical events)
+  flat    - scalar members only, wanted keys at the end
+  nested  - nested objects before the wanted keys (scanner falls back)
+
+Usage: python bench_json_extract.py [cells]
+"""
+import json
+import random
+import sys
+import time
+
+from simple_csv_processor import compile_field_extractor, extract_fields_full, flatten_json_fields
+
+PAYLOAD_SIZES = [500, 2000, 8000, 32000, 100000]
+FIELDS = ['event_type', 'user_id']
+
+MALFORMED_CELLS = [
+    '{"event_type": "click", "user_id": 7',
+    '{"event_type": "click", "user_id": tru}',
+    '["event_type", "user_id"]',
+    '{"event_type": "a", "event_type": "b", "user_id": 1}',
+    '{"meta": {"user_id": 3}, "user_id": 4}',
+    '{"note": "say \\"user_id\\": 9", "user_id": 5}',
+    '{"ev\\u0065nt_type": "escaped", "user_id": 6}',
+    '{"event_type": {"nested": [1, 2]}, "user_id": null}',
+    "{'event_type': 'python repr'}",
+    '{""event_type"": ""csv quoted""}',
+    'not json',
+    '  {"user_id" : 1.50 , "event_type":"padded"}  ',
+]
+
+
+def random_word(rng, length):
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(length))
+
+
+def random_object(rng, members):
+    return {f"attr_{i}": rng.choice([rng.randint(0, 10**6), random_word(rng, 12), True, None])
+            for i in range(members)}
+
+
+def make_payload(rng, shape, size, index):
+    """Build one JSON cell of roughly the given size in characters"""
+    wanted = {'event_type': rng.choice(['click', 'view', 'purchase']), 'user_id': index}
+    filler = {}
+    while len(json.dumps(filler)) < size:
+        key = f"section_{len(filler)}"
+        if shape == 'flat':
+            filler[key] = random_word(rng, 40)
+        else:
+            filler[key] = random_object(rng, 8)
+
+    if shape == 'event':
+        payload = {**wanted, **filler}
+    else:
+        payload = {**filler, **wanted}
+    return json.dumps(payload)
+
+
+def flatten(rows, selective):
+    config = {'columns': {'payload': {'enabled': True, 'fields': {field: True for field in FIELDS}}}}
+    return flatten_json_fields(rows, ['payload'], config, selective=selective)
+
+
+def timed(fn, repeats=3):
+    """Return (last result, best seconds) over the given number of runs"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    cells = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(42)
+    mismatches = 0
+
+    print(f"Cells per run: {cells}, fields: {', '.join(FIELDS)}")
+    print(f"{'shape':<8} {'bytes':>8} {'full us':>9} {'scan us':>9} {'speedup':>8}")
+    for shape in ['event', 'flat', 'nested']:
+        for size in PAYLOAD_SIZES:
+            # Reuse a small pool of payloads so generation doesn't dominate
+            pool = [make_payload(rng, shape, size, i) for i in range(20)]
+            rows = [[pool[i % len(pool)]] for i in range(cells)]
+            average_bytes = sum(len(cell) for cell in pool) // len(pool)
+
+            full, full_seconds = timed(lambda: flatten(rows, False))
+            scanned, scan_seconds = timed(lambda: flatten(rows, True))
+            if full != scanned:
+                mismatches += 1
+                print(f"MISMATCH: {shape} {size}")
+
+            print(f"{shape:<8} {average_bytes:>8,} {full_seconds / cells * 1e6:>9.1f} "
+                  f"{scan_seconds / cells * 1e6:>9.1f} {full_seconds / scan_seconds:>7.2f}x")
+
+    # Malformed cells are short, so call the scanner directly rather than via flatten
+    extractor = compile_field_extractor(FIELDS)
+    fallbacks = 0
+    for cell in MALFORMED_CELLS:
+        values = extractor(cell)
+        if values is None:
+            fallbacks += 1
+        elif values != extract_fields_full(cell, FIELDS):
+            mismatches += 1
+            print(f"MISMATCH: {cell!r}")
+    print(f"Malformed cells: {len(MALFORMED_CELLS)} checked, {fallbacks} fell back to a full parse")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Benchmark the compact framed wire format against the legacy JSON output.
+
+Generates a synthetic CSV, runs the processor's flatten operation and
+reports serialized size plus encode/parse time for both formats. Parse
+time is measured in Node (the real consumer) when `node` is on PATH.
+
+Usage: python bench_wire_format.py [rows] [columns]
+"""
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from simple_csv_processor import process_csv, write_framed_result
+
+NODE_PARSE_SCRIPT = r"""
+const fs = require('fs');
+const [legacyPath, framedPath, repeats] = process.argv.slice(1);
+const legacy = fs.readFileSync(legacyPath);
+const framed = fs.readFileSync(framedPath);
+
+function decodeFrames(buf) {
+  let offset = 0, meta = null;
+  const rows = [];
+  while (offset < buf.length) {
+    const type = String.fromCharCode(buf[offset]);
+    const length = buf.readUInt32BE(offset + 1);
+    const payload = buf.toString('utf-8', offset + 5, offset + 5 + length);
+    offset += 5 + length;
+    if (type === 'M') meta = JSON.parse(payload);
+    else if (type === 'R') for (const row of JSON.parse(payload)) rows.push(row);
+  }
+  return { meta, rows };
+}
+
+function time(fn) {
+  const start = process.hrtime.bigint();
+  for (let i = 0; i < repeats; i++) fn();
+  return Number(process.hrtime.bigint() - start) / 1e6 / repeats;
+}
+
+console.log(JSON.stringify({
+  legacyMs: time(() => JSON.parse(legacy.toString('utf-8'))),
+  framedMs: time(() => decodeFrames(framed)),
+}));
+"""
+
+
+def generate_csv(path, rows, columns):
+    """Write a synthetic CSV with long header names and a JSON column"""
+    headers = [f"customer_attribute_column_{i}" for i in range(columns - 1)] + ['payload']
+    rng = random.Random(42)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for i in range(rows):
+            row = [str(rng.randint(0, 10000)) for _ in range(columns - 1)]
+            row.append(json.dumps({'id': i, 'status': rng.choice(['ok', 'failed'])}))
+            writer.writerow(row)
+
+
+def timed(fn, repeats=3):
+    """Return (last result, mean seconds) over the given number of runs"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    options = {'config': {'columns': {'payload': {'enabled': True, 'fields': {'id': True, 'status': True}}}}}
+
+    workdir = tempfile.mkdtemp(prefix='wire_bench_')
+    try:
+        csv_path = os.path.join(workdir, 'input.csv')
+        generate_csv(csv_path, rows, columns)
+
+        legacy_result = process_csv(csv_path, 'flatten', options)
+        framed_result = process_csv(csv_path, 'flatten', options, columnar=True)
+
+        legacy_bytes, legacy_encode = timed(lambda: json.dumps(legacy_result).encode('utf-8'))
+
+        def encode_framed():
+            buf = io.BytesIO()
+            write_framed_result(framed_result, buf)
+            return buf.getvalue()
+
+        framed_bytes, framed_encode = timed(encode_framed)
+
+        legacy_path = os.path.join(workdir, 'legacy.json')
+        framed_path = os.path.join(workdir, 'framed.bin')
+        with open(legacy_path, 'wb') as f:
+            f.write(legacy_bytes)
+        with open(framed_path, 'wb') as f:
+            f.write(framed_bytes)
+
+        print(f"Rows: {rows}, columns: {columns}")
+        print(f"{'format':<8} {'bytes':>12} {'encode ms':>10} {'parse ms':>10}")
+
+        parse_times = {}
+        if shutil.which('node'):
+            output = subprocess.run(
+                ['node', '-e', NODE_PARSE_SCRIPT, legacy_path, framed_path, '3'],
+                capture_output=True, text=True, check=True
+            ).stdout
+            parse_times = json.loads(output)
+
+        for name, size, encode, parse_key in [
+            ('json', len(legacy_bytes), legacy_encode, 'legacyMs'),
+            ('frames', len(framed_bytes), framed_encode, 'framedMs'),
+        ]:
+            parse = f"{parse_times[parse_key]:.1f}" if parse_key in parse_times else 'n/a'
+            print(f"{name:<8} {size:>12,} {encode * 1000:>10.1f} {parse:>10}")
+
+        print(f"Size reduction: {(1 - len(framed_bytes) / len(legacy_bytes)) * 100:.1f}%")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""End-to-end load test for the upload/flatten/clean/export API.
+
+Starts the server locally in demo mode (no OpenAI key) on a free port, or
+targets an already running server with --url. Virtual users then run
+sessions against the real routes: upload a synthetic CSV, flatten its JSON
+column, clean it with a randomly chosen option set and export it in every
+format. Each concurrency level runs for --duration seconds. The report
+gives p50/p95/p99 latency and error rate per step and level, plus server
+memory over time scraped from /api/metrics (and the whole server process
+tree when the server was started here). Only localhost is contacted.
+
+Usage:
+    python load_test.py [--concurrency 1,4,16] [--duration 60] [--rows 2000]
+        [--url http://localhost:5000] [--output load_report.json]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+REQUEST_TIMEOUT = 300
+SERVER_START_TIMEOUT = 120
+
+EXPORT_FORMATS = ['csv', 'json', 'xlsx', 'sqlite']
+FLATTEN_CONFIG = {'columns': {'metadata': {'enabled': True, 'fields': {'plan': True, 'theme': True, 'score': True}}}}
+
+# Cleaning option sets sessions pick from; the server fills in schema defaults
+CLEANING_PRESETS = [
+    {},
+    {'missingData': {'strategy': 'fill', 'fillMethod': 'mean'}},
+    {'missingData': {'strategy': 'remove'}, 'stringCleaning': {'enabled': True, 'trimWhitespace': True}},
+    {'deduplication': {'enabled': True, 'ignoreCase': True}, 'outliers': {'enabled': True, 'strategy': 'clip'}},
+    {'dateNormalization': {'enabled': True}, 'categoryNormalization': {'enabled': True}},
+    {'filtering': {'removeEmptyRows': True, 'columnFilter': {'enabled': True, 'column': 'status', 'operator': 'equals', 'value': 'active'}}},
+]
+
+CITY_SPELLINGS = [['New York', 'new york', 'NewYork'], ['Los Angeles', 'los-angeles'], ['Chicago'], ['Seattle', 'seattle ']]
+STATUSES = ['active', 'inactive', 'pending']
+
+
+def generate_csv(rows, seed):
+    """Synthetic CSV with a JSON column, missing values, duplicates, mixed dates and messy categories"""
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['id', 'name', 'email', 'city', 'status', 'signup_date', 'amount', 'metadata'])
+    previous = None
+    for i in range(rows):
+        if previous and rng.random() < 0.03:
+            writer.writerow(previous)
+            continue
+        day = rng.randint(1, 28)
+        month = rng.randint(1, 12)
+        signup = rng.choice([f"2024-{month:02d}-{day:02d}", f"{month:02d}/{day:02d}/2024"])
+        amount = round(rng.lognormvariate(4, 0.5), 2) if rng.random() > 0.01 else 1e6
+        row = [
+            str(i),
+            f"User {i}",
+            '' if rng.random() < 0.05 else f"user{i}@example.com",
+            rng.choice(rng.choice(CITY_SPELLINGS)),
+            rng.choice(STATUSES),
+            signup,
+            'N/A' if rng.random() < 0.05 else str(amount),
+            json.dumps({'plan': rng.choice(['free', 'pro']), 'theme': rng.choice(['dark', 'light']),
+                        'score': rng.randint(0, 100)}),
+        ]
+        writer.writerow(row)
+        previous = row
+    return out.getvalue().encode('utf-8')
+
+
+def multipart_body(field, filename, content):
+    """Encode a single file as multipart/form-data; returns (body, content type)"""
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode(),
+        b"Content-Type: text/csv\r\n\r\n",
+        content,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def http_request(base_url, method, path, body=None, content_type='application/json'):
+    """Send one request; returns (status, response body, seconds). Status 0 means no response."""
+    data = body
+    if body is not None and content_type == 'application/json':
+        data = json.dumps(body).encode('utf-8')
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        request.add_header('Content-Type', content_type)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            payload = response.read()
+            return response.status, payload, time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), time.perf_counter() - start
+    except (urllib.error.URLError, OSError) as e:
+        return 0, str(e).encode('utf-8'), time.perf_counter() - start
+
+
+class Recorder:
+    """Thread-safe collection of per-request results"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+
+    def add(self, level, step, status, seconds, error=None):
+        with self.lock:
+            self.records.append({'level': level, 'step': step, 'status': status,
+                                 'seconds': seconds, 'error': error})
+
+
+def timed_step(base_url, recorder, level, step, method, path, body=None, content_type='application/json'):
+    """Run and record one request; returns the response body, or None on failure"""
+    status, payload, seconds = http_request(base_url, method, path, body, content_type)
+    if 200 <= status < 300:
+        recorder.add(level, step, status, seconds)
+        return payload
+    recorder.add(level, step, status, seconds, payload[:200].decode('utf-8', 'replace'))
+    return None
+
+
+def run_session(base_url, recorder, level, csv_variants, rng):
+    """One user session: upload, inspect, flatten, clean and export in every format"""
+    started = time.perf_counter()
+    name, content = rng.choice(csv_variants)
+    body, content_type = multipart_body('file', name, content)
+    uploaded = timed_step(base_url, recorder, level, 'upload', 'POST', '/api/upload', body, content_type)
+    try:
+        file_id = json.loads(uploaded)['file']['id']
+    except (TypeError, ValueError, KeyError):
+        recorder.add(level, 'session', 0, time.perf_counter() - started, 'upload failed')
+        return
+
+    ok = timed_step(base_url, recorder, level, 'get_file', 'GET', f"/api/files/{file_id}") is not None
+    ok &= timed_step(base_url, recorder, level, 'flatten', 'POST', f"/api/files/{file_id}/flatten", FLATTEN_CONFIG) is not None
+    options = rng.choice(CLEANING_PRESETS)
+    ok &= timed_step(base_url, recorder, level, 'clean', 'POST', f"/api/files/{file_id}/clean",
+                     {'cleaningOptions': options}) is not None
+    for format_type in EXPORT_FORMATS:
+        ok &= timed_step(base_url, recorder, level, f"export_{format_type}", 'POST', f"/api/files/{file_id}/export",
+                         {'format': format_type, 'includeHeaders': True}) is not None
+    recorder.add(level, 'session', 200 if ok else 0, time.perf_counter() - started, None if ok else 'step failed')
+
+
+def virtual_user(base_url, recorder, level, csv_variants, deadline, seed):
+    """Run sessions back to back until the deadline"""
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        run_session(base_url, recorder, level, csv_variants, rng)
+
+
+def parse_metrics(text):
+    """Parse unlabelled samples from Prometheus text output into a dict"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#') or '{' in line:
+            continue
+        parts = line.split()
+        if len(parts) == 2:
+            try:
+                samples[parts[0]] = float(parts[1])
+            except ValueError:
+                pass
+    return samples
+
+
+def process_tree_rss(root_pid):
+    """Resident memory in bytes of a process and all its descendants (Linux /proc), or None"""
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    rss = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # The command name may contain spaces; fields resume after its closing parenthesis
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f"/proc/{entry}/statm", 'r') as f:
+                rss[int(entry)] = int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+def sample_memory(base_url, server_pid, level_ref, samples, stop, interval):
+    """Periodically record server memory, queue depth and running subprocesses"""
+    start = time.perf_counter()
+    while not stop.wait(interval):
+        status, payload, _ = http_request(base_url, 'GET', '/api/metrics')
+        metrics = parse_metrics(payload.decode('utf-8', 'replace')) if status == 200 else {}
+        samples.append({
+            'seconds': round(time.perf_counter() - start, 1),
+            'level': level_ref[0],
+            'nodeRssBytes': metrics.get('process_resident_memory_bytes'),
+            'processTreeRssBytes': process_tree_rss(server_pid) if server_pid else None,
+            'queueDepth': metrics.get('csv_processor_queue_depth'),
+            'activeSubprocesses': metrics.get('csv_processor_active_subprocesses'),
+        })
+
+
+def free_port():
+    """Pick an unused localhost port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command():
+    """Command and NODE_ENV for the local server: the production build if present, else tsx"""
+    if os.path.exists(os.path.join(REPO_ROOT, 'dist', 'index.js')):
+        return ['node', os.path.join('dist', 'index.js')], 'production'
+    tsx = os.path.join(REPO_ROOT, 'node_modules', '.bin', 'tsx')
+    if os.path.exists(tsx):
+        return [tsx, os.path.join('server', 'index.ts')], 'development'
+    raise RuntimeError("Neither dist/index.js nor node_modules/.bin/tsx found; run `npm install` first")
+
+
+def start_server(port, workdir):
+    """Start the server in demo mode and wait until it answers"""
+    command, node_env = server_command()
+    env = dict(os.environ)
+    env.pop('OPENAI_API_KEY', None)
+    env.update({
+        'NODE_ENV': node_env,
+        'PORT': str(port),
+        'STORAGE_BACKEND': 'disk',
+        'PROCESSED_DATA_DIR': os.path.join(workdir, 'processed'),
+    })
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + SERVER_START_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}; see {log.name}")
+        status, _, _ = http_request(base_url, 'GET', '/api/files')
+        if status == 200:
+            return process, base_url
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"Server did not start within {SERVER_START_TIMEOUT}s; see {log.name}")
+
+
+def stop_server(process):
+    """Stop the server and any processor subprocesses it started"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(records, durations):
+    """Latency percentiles, error rate and throughput per concurrency level and step"""
+    summary = {}
+    groups = {}
+    for record in records:
+        groups.setdefault((record['level'], record['step']), []).append(record)
+    for (level, step), group in sorted(groups.items()):
+        latencies = sorted(r['seconds'] for r in group)
+        errors = [r for r in group if not 200 <= r['status'] < 300]
+        summary.setdefault(str(level), {})[step] = {
+            'requests': len(group),
+            'errors': len(errors),
+            'errorRate': len(errors) / len(group),
+            'p50Ms': percentile(latencies, 0.50) * 1000,
+            'p95Ms': percentile(latencies, 0.95) * 1000,
+            'p99Ms': percentile(latencies, 0.99) * 1000,
+            'perSecond': len(group) / durations[level],
+            'sampleErrors': sorted({r['error'] for r in errors if r['error']})[:3],
+        }
+    return summary
+
+
+def print_report(summary, memory_samples):
+    """Print a per-level latency table and a memory summary"""
+    print(f"{'users':>5} {'step':<14} {'reqs':>6} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>7}")
+    for level, steps in summary.items():
+        for step, stats in steps.items():
+            print(f"{level:>5} {step:<14} {stats['requests']:>6} {stats['errorRate'] * 100:>6.1f} "
+                  f"{stats['p50Ms']:>9.1f} {stats['p95Ms']:>9.1f} {stats['p99Ms']:>9.1f} {stats['perSecond']:>7.2f}")
+            for error in stats['sampleErrors']:
+                print(f"{'':>5}   ! {error}")
+
+    by_level = {}
+    for sample in memory_samples:
+        by_level.setdefault(sample['level'], []).append(sample)
+    if by_level:
+        print(f"\n{'users':>5} {'node rss MB':>12} {'tree rss MB':>12} {'max queue':>10} {'max procs':>10}")
+    for level, samples in by_level.items():
+        def peak(key):
+            values = [s[key] for s in samples if s[key] is not None]
+            return max(values) if values else None
+        node_rss, tree_rss = peak('nodeRssBytes'), peak('processTreeRssBytes')
+        print(f"{level:>5} {node_rss / 2**20 if node_rss else float('nan'):>12.1f} "
+              f"{tree_rss / 2**20 if tree_rss else float('nan'):>12.1f} "
+              f"{peak('queueDepth') or 0:>10.0f} {peak('activeSubprocesses') or 0:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the upload/flatten/clean/export API")
+    parser.add_argument('--concurrency', default='1,4,8', help="Comma-separated virtual user counts, run in turn")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds per concurrency level")
+    parser.add_argument('--rows', default='500,2000,10000', help="Comma-separated synthetic CSV sizes")
+    parser.add_argument('--url', help="Target an already running server instead of starting one")
+    parser.add_argument('--sample-interval', type=float, default=1.0, help="Seconds between memory samples")
+    parser.add_argument('--output', help="Write the full JSON report (summary, memory timeline) here")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+def run(args):
+    """Run every concurrency level; returns the process exit code"""
+    levels = [int(level) for level in args.concurrency.split(',')]
+    csv_variants = [(f"load_{rows}.csv", generate_csv(int(rows), seed=int(rows))) for rows in args.rows.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    server = None
+    completed = False
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            server, base_url = start_server(free_port(), workdir)
+            print(f"Server started at {base_url} (log: {os.path.join(workdir, 'server.log')})")
+
+        recorder = Recorder()
+        memory_samples = []
+        level_ref = [levels[0]]
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=sample_memory,
+            args=(base_url, server.pid if server else None, level_ref, memory_samples, stop, args.sample_interval),
+            daemon=True,
+        )
+        sampler.start()
+
+        durations = {}
+        for level in levels:
+            level_ref[0] = level
+            print(f"Running {level} virtual user(s) for {args.duration:.0f}s...")
+            start = time.perf_counter()
+            deadline = start + args.duration
+            users = [threading.Thread(target=virtual_user,
+                                      args=(base_url, recorder, level, csv_variants, deadline, level * 1000 + i))
+                     for i in range(level)]
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            # Sessions in flight at the deadline finish, so measure the real span
+            durations[level] = time.perf_counter() - start
+
+        stop.set()
+        sampler.join()
+
+        summary = summarize(recorder.records, durations)
+        print_report(summary, memory_samples)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'levels': levels, 'durationSeconds': durations, 'summary': summary,
+                           'memory': memory_samples}, f, indent=2)
+        completed = True
+        failed = sum(stats['errors'] for steps in summary.values() for stats in steps.values())
+        return 1 if failed else 0
+    finally:
+        if server:
+            stop_server(server)
+        # Keep the server log when the run did not complete
+        if completed:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,132 @@ import json
 import sys
 import csv
 import os
+import struct
+import hashlib
+import heapq
+import itertools
+import math
+import random
+import re
+import sqlite3
+import tempfile
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Frame types for the compact wire format (see write_framed_result)
+FRAME_META = b'M'
+FRAME_ROWS = b'R'
+FRAME_END = b'E'
+FRAME_ROW_BATCH = 5000
+
+# Approximate in-memory cost of one entry in the deduplication hash set
+DEDUP_BYTES_PER_KEY = 100
+DEDUP_RECORD = struct.Struct('>16sQ')
+DEDUP_MAX_PARTITIONS = 256
+
+# External merge sort: approximate per-cell overhead and maximum runs merged at once
+SORT_BYTES_PER_CELL = 60
+SORT_MAX_MERGE_FANIN = 64
+
+# Hash join: approximate per-cell cost of a build-side row held in the hash
+# table, and the most partitions a grace join spills each side into
+JOIN_BYTES_PER_CELL = 60
+JOIN_MAX_PARTITIONS = 256
+
+# SQLite export: rows per executemany batch
+SQLITE_BATCH_ROWS = 5000
+
+# Ad-hoc query store: default/max rows returned, default timeout, and how
+# many filtering queries on a column it takes before that column is indexed
+QUERY_DEFAULT_LIMIT = 1000
+QUERY_MAX_LIMIT = 10000
+QUERY_DEFAULT_TIMEOUT_MS = 5000
+QUERY_INDEX_THRESHOLD = 3
+
+# Category clustering: q-gram size, q-gram postings longer than this are
+# skipped as uninformative blocks, and keys shorter than the minimum are only
+# merged by fingerprint
+CATEGORY_GRAM_SIZE = 4
+CATEGORY_MAX_BLOCK = 200
+CATEGORY_MIN_FUZZY_LENGTH = 4
+# Values left out of category clustering: JSON, dates, e-mail addresses and URLs
+CATEGORY_STRUCTURED_RE = re.compile(
+    r'\s*(?:[{\[]|\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}\b|[^\s@]+@[^\s@]+\.\w+\s*$|[a-z][a-z0-9+.-]*://)',
+    re.IGNORECASE
+)
+
+# Date normalization: sample size used to infer each column's format, the
+# share of that sample the candidate formats together must parse for a
+# column to be auto-detected as a date column, per-column cache of converted
+# values and the number of unparseable examples kept in the report
+DATE_SAMPLE_SIZE = 200
+DATE_MIN_MATCH_RATIO = 0.8
+DATE_CACHE_SIZE = 100000
+DATE_MAX_EXAMPLES = 5
+
+# Candidate date formats in order of preference; 'epoch' matches Unix
+# timestamps in seconds or milliseconds and is only inferred for columns
+# configured explicitly
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%d %H:%M', '%Y/%m/%d',
+    '%m/%d/%Y', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%y', '%m-%d-%Y',
+    '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y',
+    '%d %b %Y', '%d %B %Y', '%b %d, %Y', '%B %d, %Y', '%b %d %Y', '%d-%b-%Y',
+]
+DATE_FIELD_WIDTHS = {'%Y': 4, '%m': 2, '%d': 2, '%H': 2, '%M': 2, '%S': 2}
+# strftime directives that put a time of day in the output
+DATE_TIME_DIRECTIVES = ('%H', '%I', '%M', '%S', '%X', '%T', '%c')
+
+# Selective JSON extraction: cells tried per column before deciding whether
+# the targeted key scanner pays off, and the share it must resolve to stay on
+JSON_SCAN_PROBE_CELLS = 200
+JSON_SCAN_MIN_HIT_RATE = 0.5
+# Below this many characters a full json.loads is as fast as scanning
+JSON_SCAN_MIN_CHARS = 1024
+JSON_WHITESPACE = ' \t\n\r'
+JSON_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+# Incremental file statistics: distinct values tracked per column for top
+# values (the most frequent are kept; counts are exact below this many
+# distinct values) and rows sampled for JSON column detection
+STATS_MAX_TRACKED_VALUES = 1000
+JSON_DETECT_SAMPLE_ROWS = 100
+
+# Cell values treated as missing by the missing-data handling
+MISSING_MARKERS = {'null', 'none', 'nan', 'na', 'n/a', '#n/a', 'nil', 'missing', '?', '-'}
+
+# Sampled clean preview: rows always kept from the top of the file, the
+# number of replicate groups used for variance estimates, and the per-row
+# counters extrapolated from the sample (report section, key, operation name)
+PREVIEW_HEAD_ROWS = 20
+PREVIEW_REPLICATE_GROUPS = 10
+PREVIEW_COUNTERS = [
+    ('summary', 'final_rows', None),
+    ('missing_data_report', 'rows_removed', 'missing_data_handling'),
+    ('missing_data_report', 'cells_filled', 'missing_data_handling'),
+    ('string_cleaning_report', 'fields_cleaned', 'string_cleaning'),
+    ('date_report', 'values_normalized', 'date_normalization'),
+    ('date_report', 'unparseable', 'date_normalization'),
+    ('date_report', 'time_dropped', 'date_normalization'),
+    ('filtering_report', 'rows_filtered', 'row_filtering'),
+]
+# Counters that depend on the whole file (duplicates, outlier bounds,
+# category clusters); a sample can't estimate them, so they are computed
+# exactly where cheap and reported as unavailable otherwise
+PREVIEW_DATASET_COUNTERS = [
+    ('category_report', 'values_changed', 'category_normalization'),
+    ('deduplication_report', 'duplicates_removed', 'deduplication'),
+    ('outlier_report', 'outliers_found', 'outlier_handling'),
+    ('outlier_report', 'rows_dropped', 'outlier_handling'),
+]
 
 def detect_json_columns(rows, headers):
     """Detect columns that contain JSON data"""
@@ -12,7 +138,7 @@ def detect_json_columns(rows, headers):
     for col_idx, header in enumerate(headers):
         json_count = 0
         field_set = set()
-        sample_size = min(100, len(rows))
+        sample_size = min(JSON_DETECT_SAMPLE_ROWS, len(rows))
         
         for i in range(sample_size):
             if col_idx < len(rows[i]):
@@ -32,14 +158,18 @@ def detect_json_columns(rows, headers):
     
     return json_columns, json_fields
 
-def analyze_csv(file_path):
-    """Analyze CSV file and return metadata"""
+def analyze_csv(file_path, stats_path=None):
+    """Analyze CSV file and return metadata; optionally save incremental stats state"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             reader = csv.reader(f)
             headers = next(reader)
             rows = list(reader)
         
+        if stats_path:
+            state = update_file_stats(new_file_stats(headers), rows)
+            save_file_stats(state, stats_path, source_fingerprint(file_path))
+        
         json_columns, json_fields = detect_json_columns(rows, headers)
         
         # Get preview data (first 20 rows)
@@ -103,8 +233,330 @@ def analyze_csv(file_path):
     except Exception as e:
         raise Exception(f"Error analyzing CSV: {str(e)}")
 
-def flatten_json_fields(rows, headers, config):
-    """Flatten JSON fields based on configuration"""
+def new_file_stats(headers):
+    """Empty incremental statistics state for a file with these headers"""
+    return {
+        'headers': list(headers),
+        'rows': 0,
+        'missing_cells': 0,
+        'json_sampled_rows': 0,
+        'columns': [
+            {'values': {}, 'values_trimmed': 0, 'numeric_count': 0, 'numeric_sum': 0.0,
+             'json_count': 0, 'json_fields': {}}
+            for _ in headers
+        ],
+    }
+
+def merge_value_counts(column, counts):
+    """Merge value counts into a column's summary of at most STATS_MAX_TRACKED_VALUES values.
+    
+    On overflow only the most frequent values are kept, in first-seen order.
+    Counts are exact until then; after that a value that was dropped and
+    seen again is undercounted by at most values_trimmed.
+    """
+    merged = Counter(column['values'])
+    merged.update(counts)
+    if len(merged) > STATS_MAX_TRACKED_VALUES:
+        ranked = sorted(merged.items(), key=lambda x: x[1], reverse=True)
+        column['values_trimmed'] += ranked[STATS_MAX_TRACKED_VALUES][1]
+        kept = {value for value, _ in ranked[:STATS_MAX_TRACKED_VALUES]}
+        merged = {value: count for value, count in merged.items() if value in kept}
+    column['values'] = dict(merged)
+
+def is_json_column(state, col_idx):
+    """Whether a column counts as JSON, by the same rule as detect_json_columns"""
+    sampled = state['json_sampled_rows']
+    return sampled > 0 and state['columns'][col_idx]['json_count'] > sampled * 0.1
+
+def update_file_stats(state, rows):
+    """Fold new rows into an incremental statistics state and return it.
+    
+    Only the given rows are read. Missing cells and the JSON detection
+    sample follow analyze_csv; JSON field sets keep growing from every new
+    JSON cell once a column is detected as JSON.
+    """
+    headers = state['headers']
+    sample_start = state['json_sampled_rows']
+    sample_rows = rows[:max(0, JSON_DETECT_SAMPLE_ROWS - sample_start)]
+    state['rows'] += len(rows)
+    state['missing_cells'] += sum(row.count('') for row in rows)
+    state['json_sampled_rows'] += len(sample_rows)
+    
+    for col_idx, column in enumerate(state['columns']):
+        cells = [row[col_idx] for row in rows if col_idx < len(row)]
+        
+        for cell in cells[:len(sample_rows)]:
+            if cell.strip().startswith('{'):
+                try:
+                    parsed = json.loads(cell)
+                except ValueError:
+                    continue
+                if isinstance(parsed, dict):
+                    column['json_count'] += 1
+                    column['json_fields'].update(dict.fromkeys(parsed))
+        
+        is_json = is_json_column(state, col_idx)
+        if is_json and state['json_sampled_rows'] >= JSON_DETECT_SAMPLE_ROWS:
+            # The sample is full, so the column stays JSON: track fields, not values
+            for cell in cells[len(sample_rows):]:
+                if cell.strip().startswith('{'):
+                    try:
+                        parsed = json.loads(cell)
+                    except ValueError:
+                        continue
+                    if isinstance(parsed, dict):
+                        column['json_fields'].update(dict.fromkeys(parsed))
+            column['values'] = {}
+            continue
+        
+        merge_value_counts(column, Counter(cell for cell in cells if cell))
+        for cell in cells:
+            try:
+                number = float(cell)
+            except ValueError:
+                continue
+            if math.isfinite(number):
+                column['numeric_count'] += 1
+                column['numeric_sum'] += number
+    return state
+
+def file_stats_result(state):
+    """Render an incremental statistics state like analyze_csv's metadata"""
+    headers = state['headers']
+    json_indices = [i for i in range(len(headers)) if is_json_column(state, i)]
+    json_columns = [headers[i] for i in json_indices]
+    total_cells = state['rows'] * len(headers)
+    
+    distributions = {}
+    numeric_summary = {}
+    for col_idx, header in enumerate(headers):
+        column = state['columns'][col_idx]
+        if col_idx not in json_indices:
+            top = sorted(column['values'].items(), key=lambda x: x[1], reverse=True)[:10]
+            if top:
+                distributions[header] = {
+                    'values': [item[0] for item in top],
+                    'counts': [item[1] for item in top]
+                }
+        if column['numeric_count']:
+            numeric_summary[header] = {
+                'count': column['numeric_count'],
+                'sum': column['numeric_sum'],
+                'mean': column['numeric_sum'] / column['numeric_count'],
+            }
+    
+    return {
+        'rows': state['rows'],
+        'columns': len(headers),
+        'jsonColumns': json_columns,
+        'jsonFields': {headers[i]: list(state['columns'][i]['json_fields']) for i in json_indices},
+        'stats': {
+            'totalRows': state['rows'],
+            'totalColumns': len(headers),
+            'missingDataPercentage': (state['missing_cells'] / total_cells) * 100 if total_cells > 0 else 0,
+            'columnTypes': {
+                'text': len(headers) - len(json_columns),
+                'numeric': 0,
+                'json': len(json_columns)
+            }
+        },
+        'distributions': distributions,
+        'numericSummary': numeric_summary,
+        'columnNames': headers
+    }
+
+def save_file_stats(state, stats_path, fingerprint):
+    """Write the statistics state for the file version with this fingerprint"""
+    tmp_path = f"{stats_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'state': state}, f)
+    os.replace(tmp_path, stats_path)
+
+def load_file_stats(stats_path, fingerprint):
+    """Saved statistics state if it describes this file version, else None"""
+    try:
+        with open(stats_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return saved['state'] if saved.get('fingerprint') == fingerprint else None
+
+def align_append_headers(headers, new_headers):
+    """Positions of the base columns in the new file's rows; raises if the headers don't match"""
+    if new_headers == headers:
+        return None
+    missing = [h for h in headers if h not in new_headers]
+    unexpected = [h for h in new_headers if h not in headers]
+    if missing or unexpected or len(set(headers)) != len(headers) or len(new_headers) != len(headers):
+        details = []
+        if missing:
+            details.append(f"missing columns: {', '.join(missing)}")
+        if unexpected:
+            details.append(f"unexpected columns: {', '.join(unexpected)}")
+        raise Exception(f"Appended file headers don't match ({'; '.join(details) or 'duplicate column names'})")
+    # Same columns in another order
+    return [new_headers.index(h) for h in headers]
+
+def ends_with_newline(path):
+    """Whether a file is empty or its last byte ends a line"""
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b'\n', b'\r')
+
+def append_csv(file_path, append_path, stats_path, store_path=None):
+    """Append the rows of another CSV to a file and update its derived state incrementally.
+    
+    Only the appended rows are parsed: they update the saved statistics
+    state (rebuilt from the whole file once if missing or stale) and are
+    inserted into the query store if one is current. Returns the updated
+    file metadata plus an append summary.
+    """
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        headers = next(csv.reader(f), [])
+    with open(append_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        new_headers = next(reader, [])
+        new_rows = list(reader)
+    
+    order = align_append_headers(headers, new_headers)
+    if order is not None:
+        new_rows = [[row[i] if i < len(row) else '' for i in order] for row in new_rows]
+    
+    previous_fingerprint = source_fingerprint(file_path)
+    state = load_file_stats(stats_path, previous_fingerprint)
+    stats_rebuilt = state is None
+    if stats_rebuilt:
+        state = update_file_stats(new_file_stats(headers), list(read_csv_rows(file_path)))
+    
+    with open(file_path, 'a', encoding='utf-8', newline='') as f:
+        if not ends_with_newline(file_path):
+            f.write('\r\n')
+        csv.writer(f).writerows(new_rows)
+    
+    previous_rows = state['rows']
+    fingerprint = source_fingerprint(file_path)
+    save_file_stats(update_file_stats(state, new_rows), stats_path, fingerprint)
+    store_status = 'absent'
+    if store_path:
+        store_status = extend_query_store(store_path, previous_fingerprint, fingerprint, new_rows, headers, previous_rows)
+    
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        preview = [
+            {header: (row[i] if i < len(row) and row[i] != '' else None) for i, header in enumerate(headers)}
+            for row in itertools.islice(reader, 20)
+        ]
+    
+    result = file_stats_result(state)
+    result['preview'] = preview
+    result['append'] = {
+        'rowsAppended': len(new_rows),
+        'columnsReordered': order is not None,
+        'statsRebuilt': stats_rebuilt,
+        'queryStore': store_status,
+    }
+    return result
+
+def is_plain_json_key(key):
+    """Keys whose only JSON spelling is the key itself in quotes, so a text search finds them"""
+    return (key.isascii() and key.isprintable() and '"' not in key and '\\' not in key
+            and key[:1] not in ('', ' ', ',', ':', ']', '}'))
+
+def compile_field_extractor(fields):
+    """Build a targeted scanner returning the flattened values of fields from a JSON cell.
+    
+    Each field is found by searching the raw text for its quoted key and
+    only that member's value is decoded; everything else is skipped without
+    building Python objects. A key counts as top-level when no '{' or '['
+    other than the opening brace precedes it. The scanner returns None when
+    it can't vouch for the result (nested data before a key, repeated or
+    escaped keys, malformed values, truncated cells) and the caller falls
+    back to a full parse. For valid JSON the values match json.loads.
+    Returns None if some field can't be searched for as plain text.
+    """
+    if not all(is_plain_json_key(field) for field in fields):
+        return None
+    
+    # The needle omits the closing quote: ending on a letter lets str.find skip ahead
+    needles = [(f'"{field}', len(field) + 1) for field in fields]
+    # An escaped spelling of a key character would make a second copy of the key
+    escape_sets = [
+        {seq for ch in field for seq in (f'\\u{ord(ch):04x}', f'\\u{ord(ch):04X}')} | ({'\\/'} if '/' in field else set())
+        for field in fields
+    ]
+    raw_decode = json.JSONDecoder().raw_decode
+    skip_whitespace = JSON_WHITESPACE_RE.match
+    
+    def extract(cell):
+        text = cell.strip(JSON_WHITESPACE)
+        if text[:1] != '{' or text[-1:] != '}':
+            return None
+        has_escapes = '\\' in text
+        values = []
+        for (needle, needle_length), escapes in zip(needles, escape_sets):
+            if has_escapes and any(seq in text for seq in escapes):
+                return None
+            value_start = -1
+            position = text.find(needle)
+            while position != -1:
+                if text[position - 1] == '\\':
+                    return None
+                end = position + needle_length
+                if text[end:end + 1] == '"':
+                    colon = end + 1
+                    if text[colon:colon + 1] != ':':
+                        colon = skip_whitespace(text, colon).end()
+                    if text[colon:colon + 1] == ':':
+                        if value_start != -1:
+                            return None
+                        value_start = colon + 1
+                position = text.find(needle, position + 1)
+            
+            if value_start == -1:
+                values.append('')
+                continue
+            if text.find('{', 1, value_start) != -1 or text.find('[', 0, value_start) != -1:
+                return None
+            if text[value_start] in JSON_WHITESPACE:
+                value_start = skip_whitespace(text, value_start).end()
+            try:
+                value, value_end = raw_decode(text, value_start)
+            except ValueError:
+                return None
+            separator = value_end
+            if text[separator:separator + 1] not in (',', '}'):
+                separator = skip_whitespace(text, value_end).end()
+            if text[separator:separator + 1] not in (',', '}'):
+                return None
+            values.append(str(value) if value is not None else '')
+        return values
+    return extract
+
+def extract_fields_full(cell, fields):
+    """Flattened values of fields from a JSON cell using a full json.loads"""
+    try:
+        json_data = json.loads(cell)
+    except:
+        return [''] * len(fields)
+    if not isinstance(json_data, dict):
+        return [''] * len(fields)
+    values = []
+    for field in fields:
+        value = json_data.get(field, '')
+        values.append(str(value) if value is not None else '')
+    return values
+
+def flatten_json_fields(rows, headers, config, selective=True):
+    """Flatten JSON fields based on configuration.
+    
+    With selective on, enabled fields are pulled out by a targeted scanner
+    (compile_field_extractor) instead of parsing every cell in full. Short
+    cells are always parsed in full, and the scanner is switched off for a
+    column if it falls back on most of the cells it is tried on.
+    """
     if not config or 'columns' not in config:
         return rows, headers
     
@@ -127,6 +579,13 @@ def flatten_json_fields(rows, headers, config):
             if new_header not in new_headers:
                 new_headers.append(new_header)
     
+    extractors = {
+        col_idx: compile_field_extractor(fields) if selective else None
+        for col_idx, (_, fields) in columns_to_flatten.items()
+    }
+    attempts = Counter()
+    hits = Counter()
+    
     # Process each row
     for row in rows:
         new_row = row.copy()
@@ -137,18 +596,18 @@ def flatten_json_fields(rows, headers, config):
         # Add flattened fields
         for col_idx, (col_name, fields) in columns_to_flatten.items():
             if col_idx < len(row) and row[col_idx]:
-                try:
-                    json_data = json.loads(row[col_idx])
-                    if isinstance(json_data, dict):
-                        for field in fields:
-                            value = json_data.get(field, '')
-                            new_row.append(str(value) if value is not None else '')
-                    else:
-                        for _ in fields:
-                            new_row.append('')
-                except:
-                    for _ in fields:
-                        new_row.append('')
+                values = None
+                extractor = extractors[col_idx]
+                if extractor and len(row[col_idx]) >= JSON_SCAN_MIN_CHARS:
+                    values = extractor(row[col_idx])
+                    attempts[col_idx] += 1
+                    if values is not None:
+                        hits[col_idx] += 1
+                    # Decide on the probe cell itself, whether or not it was resolved
+                    if (attempts[col_idx] == JSON_SCAN_PROBE_CELLS
+                            and hits[col_idx] < JSON_SCAN_MIN_HIT_RATE * JSON_SCAN_PROBE_CELLS):
+                        extractors[col_idx] = None
+                new_row.extend(values if values is not None else extract_fields_full(row[col_idx], fields))
             else:
                 for _ in fields:
                     new_row.append('')
@@ -227,8 +686,8 @@ def normalize_column_names(headers, options):
     
     return new_headers, column_changes
 
-def calculate_statistics(values):
-    """Calculate mean, median, mode for numeric values"""
+def calculate_statistics(values, bounds=None):
+    """Calculate mean, median, mode for numeric values, ignoring values outside bounds"""
     numeric_values = []
     for val in values:
         if val and str(val).strip() and is_numeric_string(val):
@@ -237,6 +696,10 @@ def calculate_statistics(values):
             except (ValueError, TypeError):
                 continue
     
+    if bounds:
+        low, high = bounds
+        numeric_values = [val for val in numeric_values if low <= val <= high]
+    
     if not numeric_values:
         return None, None, None
     
@@ -258,8 +721,12 @@ def calculate_statistics(values):
     
     return mean_val, median_val, mode_val
 
-def handle_missing_data(rows, headers, options, column_types=None):
-    """Enhanced missing data handling with smart fill options"""
+def handle_missing_data(rows, headers, options, column_types=None, value_bounds=None):
+    """Enhanced missing data handling with smart fill options.
+    
+    value_bounds maps column names to (low, high) ranges; values outside them
+    (flagged outliers) are left out of the mean/median/mode used for fills.
+    """
     if not options:
         return rows, {}
     
@@ -288,7 +755,7 @@ def handle_missing_data(rows, headers, options, column_types=None):
                 if (cell is None or 
                     cell == '' or 
                     cell_str.strip() == '' or 
-                    cell_str.lower().strip() in ['null', 'none', 'nan', 'na', 'n/a', '#n/a', 'nil', 'missing', '?', '-']):
+                    cell_str.lower().strip() in MISSING_MARKERS):
                     has_missing = True
                     break
             if not has_missing:
@@ -321,7 +788,7 @@ def handle_missing_data(rows, headers, options, column_types=None):
         if strategy == 'smart_fill' or fill_method in ['mean', 'median', 'mode']:
             for i, header in enumerate(headers):
                 column_values = [row[i] if i < len(row) else '' for row in rows]
-                mean_val, median_val, mode_val = calculate_statistics(column_values)
+                mean_val, median_val, mode_val = calculate_statistics(column_values, (value_bounds or {}).get(header))
                 column_stats[header] = {
                     'mean': mean_val,
                     'median': median_val,
@@ -337,7 +804,7 @@ def handle_missing_data(rows, headers, options, column_types=None):
                 if (cell is None or 
                     cell == '' or 
                     cell_str.strip() == '' or 
-                    cell_str.lower().strip() in ['null', 'none', 'nan', 'na', 'n/a', '#n/a', 'nil', 'missing', '?', '-']):
+                    cell_str.lower().strip() in MISSING_MARKERS):
                     # Determine fill value
                     if strategy == 'smart_fill':
                         # Smart fill based on column type
@@ -372,6 +839,675 @@ def handle_missing_data(rows, headers, options, column_types=None):
     
     return rows, changes_report
 
+class RunningStats:
+    """Welford's streaming mean and variance"""
+    __slots__ = ('count', 'mean', 'm2')
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+    
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+    
+    def stdev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+class P2Quantile:
+    """Streaming quantile estimate with the P-square algorithm (Jain & Chlamtac).
+    
+    The first values are buffered and answered exactly; past that the five
+    markers are seeded from the buffer, so memory stays constant.
+    """
+    
+    def __init__(self, p, exact_limit=512):
+        self.p = p
+        self.exact_limit = exact_limit
+        self.buffer = []
+        self.heights = None
+    
+    def seed_markers(self):
+        ordered = sorted(self.buffer)
+        last = len(ordered) - 1
+        p = self.p
+        self.desired = [0, last * p / 2, last * p, last * (1 + p) / 2, last]
+        self.positions = [0, round(self.desired[1]), round(self.desired[2]), round(self.desired[3]), last]
+        self.heights = [ordered[i] for i in self.positions]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+        self.buffer = None
+    
+    def add(self, value):
+        if self.heights is None:
+            self.buffer.append(value)
+            if len(self.buffer) > self.exact_limit:
+                self.seed_markers()
+            return
+        
+        q = self.heights
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+        
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = candidate
+                n[i] += step
+    
+    def value(self):
+        if self.heights is not None:
+            return self.heights[2]
+        if not self.buffer:
+            return None
+        # Linear interpolation between closest ranks
+        ordered = sorted(self.buffer)
+        rank = (len(ordered) - 1) * self.p
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def format_number(value):
+    """Render a float without a trailing .0 for whole numbers"""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def handle_outliers(rows, headers, options, column_types=None):
+    """Flag, clip or drop numeric outliers using streaming statistics.
+    
+    One pass gathers Welford mean/variance (z-score) or P-square quartile
+    estimates (IQR) per column; a second pass applies the strategy. Returns
+    the rows, a report and the (low, high) bounds per column.
+    """
+    if not options or not options.get('enabled', False):
+        return rows, headers, {}, {}
+    
+    method = options.get('method', 'iqr')
+    strategy = options.get('strategy', 'flag')
+    threshold = options.get('threshold', 3.0 if method == 'zscore' else 1.5)
+    columns = options.get('columns') or [h for h in headers if (column_types or {}).get(h) == 'numeric']
+    indices = [(headers.index(col), col) for col in columns if col in headers]
+    
+    # Pass 1: streaming statistics
+    trackers = {}
+    for idx, col in indices:
+        trackers[idx] = RunningStats() if method == 'zscore' else (P2Quantile(0.25), P2Quantile(0.75))
+    for row in rows:
+        for idx, _ in indices:
+            if idx < len(row) and row[idx]:
+                try:
+                    value = float(row[idx])
+                except ValueError:
+                    continue
+                # NaN and inf are left to the missing-data stage, not the statistics
+                if not math.isfinite(value):
+                    continue
+                tracker = trackers[idx]
+                if method == 'zscore':
+                    tracker.add(value)
+                else:
+                    tracker[0].add(value)
+                    tracker[1].add(value)
+    
+    bounds = {}
+    for idx, col in indices:
+        tracker = trackers[idx]
+        if method == 'zscore':
+            if tracker.count < 2:
+                continue
+            spread = threshold * tracker.stdev()
+            bounds[col] = (tracker.mean - spread, tracker.mean + spread)
+        else:
+            q1, q3 = tracker[0].value(), tracker[1].value()
+            if q1 is None:
+                continue
+            iqr = q3 - q1
+            bounds[col] = (q1 - threshold * iqr, q3 + threshold * iqr)
+    
+    # Pass 2: apply the strategy
+    column_counts = {col: 0 for col in bounds}
+    bounded = [(idx, col, bounds[col]) for idx, col in indices if col in bounds]
+    new_rows = []
+    rows_dropped = 0
+    for row in rows:
+        outlier_cols = set()
+        new_row = row
+        for idx, col, (low, high) in bounded:
+            if idx >= len(row) or not row[idx]:
+                continue
+            try:
+                value = float(row[idx])
+            except ValueError:
+                continue
+            if not math.isfinite(value) or low <= value <= high:
+                continue
+            outlier_cols.add(col)
+            column_counts[col] += 1
+            if strategy == 'clip':
+                if new_row is row:
+                    new_row = row.copy()
+                new_row[idx] = format_number(low if value < low else high)
+        
+        if strategy == 'drop' and outlier_cols:
+            rows_dropped += 1
+            continue
+        new_rows.append(new_row)
+    
+    # Flag columns are added only for columns that had outliers
+    flag_columns = [col for col in bounds if column_counts[col] > 0] if strategy == 'flag' else []
+    new_headers = headers
+    if flag_columns:
+        new_headers = headers + [f"{col}_outlier" for col in flag_columns]
+        flag_indices = [(headers.index(col), bounds[col]) for col in flag_columns]
+        width = len(headers)
+        flagged_rows = []
+        for row in new_rows:
+            flags = []
+            for idx, (low, high) in flag_indices:
+                flag = 'false'
+                if idx < len(row) and row[idx]:
+                    try:
+                        value = float(row[idx])
+                        if math.isfinite(value) and not low <= value <= high:
+                            flag = 'true'
+                    except ValueError:
+                        pass
+                flags.append(flag)
+            padded = row + [''] * (width - len(row)) if len(row) < width else row[:width]
+            flagged_rows.append(padded + flags)
+        new_rows = flagged_rows
+    
+    changes_report = {
+        'method': method,
+        'strategy': strategy,
+        'threshold': threshold,
+        'outliers_found': sum(column_counts.values()),
+        'rows_dropped': rows_dropped,
+        'columns': {
+            col: {'count': column_counts[col], 'low': bounds[col][0], 'high': bounds[col][1]}
+            for col in bounds
+        }
+    }
+    return new_rows, new_headers, changes_report, bounds
+
+def compile_slice_parser(fmt):
+    """Build a slice-based parser for a fixed-width numeric format, or None.
+    
+    '%Y-%m-%d' becomes a length check, separator checks and int() on fixed
+    slices. Zero padding is required, so '3/1/2024' is left to strptime.
+    """
+    spans = {}
+    separators = []
+    position = 0
+    i = 0
+    while i < len(fmt):
+        if fmt[i] == '%':
+            directive = fmt[i:i + 2]
+            if directive not in DATE_FIELD_WIDTHS:
+                return None
+            spans[directive] = (position, position + DATE_FIELD_WIDTHS[directive])
+            position += DATE_FIELD_WIDTHS[directive]
+            i += 2
+        else:
+            separators.append((position, fmt[i]))
+            position += 1
+            i += 1
+    if not {'%Y', '%m', '%d'} <= spans.keys():
+        return None
+    
+    length = position
+    (y0, y1), (m0, m1), (d0, d1) = spans['%Y'], spans['%m'], spans['%d']
+    time_fields = [spans[directive] for directive in ('%H', '%M', '%S') if directive in spans]
+    
+    def parse(value):
+        if len(value) != length:
+            return None
+        for pos, char in separators:
+            if value[pos] != char:
+                return None
+        try:
+            if time_fields:
+                return datetime(int(value[y0:y1]), int(value[m0:m1]), int(value[d0:d1]),
+                                *[int(value[start:end]) for start, end in time_fields])
+            return datetime(int(value[y0:y1]), int(value[m0:m1]), int(value[d0:d1]))
+        except ValueError:
+            return None
+    return parse
+
+def parse_epoch(value):
+    """Parse a Unix timestamp in seconds (9-10 digits) or milliseconds (12-13 digits)"""
+    digits = value.split('.', 1)[0]
+    if not digits.isdigit():
+        return None
+    try:
+        if len(digits) in (9, 10):
+            return datetime(1970, 1, 1) + timedelta(seconds=float(value))
+        if len(digits) in (12, 13):
+            return datetime(1970, 1, 1) + timedelta(milliseconds=float(value))
+    except (ValueError, OverflowError):
+        pass
+    return None
+
+def build_date_parser(fmt):
+    """Return the fastest parser for one format; it yields a datetime or None"""
+    if fmt == 'epoch':
+        return parse_epoch
+    slice_parser = compile_slice_parser(fmt)
+    
+    def parse(value):
+        if slice_parser:
+            result = slice_parser(value)
+            if result is not None:
+                return result
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            return None
+    return parse
+
+def build_date_formatter(output_format, has_time):
+    """Return a datetime -> string function, using isoformat() for ISO outputs"""
+    if not output_format:
+        output_format = '%Y-%m-%d %H:%M:%S' if has_time else '%Y-%m-%d'
+    if output_format == '%Y-%m-%d':
+        return lambda value: value.date().isoformat()
+    if output_format == '%Y-%m-%d %H:%M:%S':
+        return lambda value: value.isoformat(sep=' ', timespec='seconds')
+    if output_format == '%Y-%m-%dT%H:%M:%S':
+        return lambda value: value.isoformat(timespec='seconds')
+    return lambda value: value.strftime(output_format)
+
+def infer_date_format(values, parsers):
+    """Return (format, covered) for a sample of values.
+    
+    format is the candidate that parses the most values; covered counts the
+    values parsed by any candidate, so mixed-format columns are recognized.
+    """
+    best_format, best_matches = None, 0
+    parsed = [False] * len(values)
+    for fmt, parse in parsers:
+        matches = 0
+        for i, value in enumerate(values):
+            if parse(value) is not None:
+                matches += 1
+                parsed[i] = True
+        if matches > best_matches:
+            best_format, best_matches = fmt, matches
+    return best_format, sum(parsed)
+
+def date_format_has_time(fmt):
+    """Whether values parsed with an input format carry a time of day"""
+    return fmt == 'epoch' or '%H' in fmt
+
+def build_date_converter(fmt, parsers, output_format, clear_invalid, examples):
+    """Return a function converting one cell to (new value, outcome, time dropped).
+    
+    Outcomes are 'parsed' (dominant format), 'fallback', 'unparseable' and
+    'missing'. Without an output format, values parsed with a time keep it
+    even if the dominant format is date-only; an explicit date-only output
+    format drops it and the third element flags that. Unparseable values
+    are appended to examples up to a limit.
+    """
+    primary = build_date_parser(fmt)
+    primary_has_time = date_format_has_time(fmt)
+    fallbacks = [(date_format_has_time(name), parser) for name, parser in parsers if name != fmt]
+    format_date = build_date_formatter(output_format, primary_has_time)
+    format_datetime = build_date_formatter(output_format, True)
+    output_has_time = not output_format or any(d in output_format for d in DATE_TIME_DIRECTIVES)
+    
+    def convert(value):
+        stripped = value.strip()
+        if not stripped or stripped.lower() in MISSING_MARKERS:
+            return value, 'missing', False
+        parsed = primary(stripped)
+        outcome = 'parsed'
+        has_time = primary_has_time
+        if parsed is None and len(stripped) <= 40 and any(ch.isdigit() for ch in stripped):
+            for position, (fallback_has_time, parse) in enumerate(fallbacks):
+                parsed = parse(stripped)
+                if parsed is not None:
+                    # Later outliers in this column most likely share this format
+                    fallbacks.insert(0, fallbacks.pop(position))
+                    outcome = 'fallback'
+                    has_time = fallback_has_time
+                    break
+        if parsed is not None:
+            try:
+                formatted = format_datetime(parsed) if has_time else format_date(parsed)
+                return formatted, outcome, has_time and not output_has_time
+            except ValueError:
+                pass
+        if len(examples) < DATE_MAX_EXAMPLES:
+            examples.append(value)
+        return ('' if clear_invalid else value), 'unparseable', False
+    return convert
+
+def normalize_dates(rows, headers, options, column_types=None):
+    """Parse date columns and rewrite them in one output format.
+    
+    A column is picked up when the candidate formats together parse most of
+    a sample, so mixed-format columns qualify. Its dominant format is
+    inferred from the same sample and the bulk is parsed with that format's
+    specialized parser. Only values it rejects are
+    tried against the other formats, with formats that succeeded moved to
+    the front. Converted values are cached per column. Returns (rows,
+    report, normalized column names).
+    """
+    if not options or not options.get('enabled', False):
+        return rows, {}, []
+    
+    day_first = options.get('dayFirst', False)
+    output_format = options.get('outputFormat') or None
+    clear_invalid = options.get('invalidValues', 'keep') == 'empty'
+    explicit_columns = options.get('columns') or []
+    if explicit_columns:
+        indices = [(headers.index(col), col) for col in explicit_columns if col in headers]
+    else:
+        indices = [(i, h) for i, h in enumerate(headers) if (column_types or {}).get(h, 'text') == 'text']
+    
+    # Ambiguous day/month orders are ranked by preference; the sort is stable
+    formats = sorted(DATE_FORMATS, key=lambda fmt: fmt.startswith('%m')) if day_first else list(DATE_FORMATS)
+    if explicit_columns:
+        formats.append('epoch')
+    parsers = [(fmt, build_date_parser(fmt)) for fmt in formats]
+    
+    changes_report = {
+        'values_normalized': 0,
+        'unparseable': 0,
+        'time_dropped': 0,
+        'columns': {}
+    }
+    
+    plans = []
+    sample_rows = random.Random(0).sample(rows, min(len(rows), DATE_SAMPLE_SIZE))
+    for idx, col in indices:
+        sample = []
+        for row in sample_rows:
+            if idx < len(row):
+                value = row[idx].strip()
+                if value and value.lower() not in MISSING_MARKERS:
+                    sample.append(value)
+        if not sample:
+            continue
+        fmt, covered = infer_date_format(sample, parsers)
+        if fmt is None or (not explicit_columns and covered < DATE_MIN_MATCH_RATIO * len(sample)):
+            continue
+        plans.append((idx, col, fmt))
+    
+    if not plans:
+        return rows, changes_report, []
+    
+    states = []
+    for idx, col, fmt in plans:
+        examples = []
+        convert = build_date_converter(fmt, parsers, output_format, clear_invalid, examples)
+        states.append((idx, col, fmt, convert, {}, Counter(), examples))
+    
+    new_rows = []
+    for row in rows:
+        new_row = row
+        for idx, _, _, convert, cache, counts, _ in states:
+            if idx >= len(row) or not row[idx]:
+                continue
+            value = row[idx]
+            result = cache.get(value)
+            if result is None:
+                if len(cache) >= DATE_CACHE_SIZE:
+                    cache.clear()
+                result = cache[value] = convert(value)
+            counts[result[1]] += 1
+            if result[2]:
+                counts['time_dropped'] += 1
+            if result[0] != value:
+                if new_row is row:
+                    new_row = row.copy()
+                new_row[idx] = result[0]
+                counts['changed'] += 1
+        new_rows.append(new_row)
+    
+    for _, col, fmt, _, _, counts, examples in states:
+        changes_report['columns'][col] = {
+            'format': fmt,
+            'parsed': counts['parsed'],
+            'fallback_parsed': counts['fallback'],
+            'unparseable': counts['unparseable'],
+            'values_changed': counts['changed'],
+            'time_dropped': counts['time_dropped'],
+            'unparseable_examples': examples,
+        }
+        changes_report['values_normalized'] += counts['changed']
+        changes_report['unparseable'] += counts['unparseable']
+        changes_report['time_dropped'] += counts['time_dropped']
+    
+    return new_rows, changes_report, [col for _, col, _ in plans]
+
+def category_keys(value):
+    """Fingerprint and compact keys for a category value.
+    
+    The fingerprint is the sorted set of lowercase ASCII tokens ("York, New"
+    and "new york" agree) followed by the numbers in their original order,
+    so "3 Main St Apt 12" and "12 Main St Apt 3" stay apart. The compact key
+    is the tokens joined without separators ("New-York" and "NewYork"
+    agree), except that a space is kept between two numbers ("2-1" and "21"
+    differ).
+    """
+    ascii_value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii').lower()
+    tokens = [token for token in re.split(r'[^0-9a-z]+', ascii_value) if token]
+    compact = ''
+    for token in tokens:
+        if compact[-1:].isdigit() and token[0].isdigit():
+            compact += ' '
+        compact += token
+    numbers = re.findall(r'\d+', ascii_value)
+    return ' '.join(sorted(set(tokens))) + ' #' + ' '.join(numbers), compact
+
+def bounded_levenshtein(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 once it is certainly exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if max_distance == 1:
+        # Single-edit check by comparing the tails after the common prefix
+        if a == b:
+            return 0
+        if len(a) < len(b):
+            a, b = b, a
+        i = len(os.path.commonprefix([a, b]))
+        tail_matches = a[i + 1:] == (b[i + 1:] if len(a) == len(b) else b[i:])
+        return 1 if tail_matches else 2
+    # A shared prefix or suffix never changes the distance
+    start = len(os.path.commonprefix([a, b]))
+    end = len(os.path.commonprefix([a[start:][::-1], b[start:][::-1]]))
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return min(max(len(a), len(b)), max_distance + 1)
+    # Only cells within max_distance of the diagonal can stay within the bound
+    outside = max_distance + 1
+    previous = [j if j <= max_distance else outside for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [i if i <= max_distance else outside] + [outside] * len(b)
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != b[j - 1]))
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return outside
+        previous = current
+    return min(previous[-1], outside)
+
+def cluster_categories(value_counts, similarity=0.85, deadline=None):
+    """Group near-duplicate values and map each to its cluster's most frequent form.
+    
+    Values sharing a fingerprint or compact key are merged directly; both
+    keys keep numbers in order, and structured values (JSON, dates, e-mail
+    addresses, URLs) are left out. Edit
+    distance is only computed between compact keys with the same numbers
+    that share a q-gram block, so unique identifiers are never compared.
+    Returns (mapping of changed values, timed_out).
+    """
+    parent = {}
+    
+    def find(node):
+        root = node
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(node, node) != root:
+            parent[node], node = root, parent[node]
+        return root
+    
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+    
+    value_keys = {}
+    for value in value_counts:
+        # Reordering tokens would corrupt structured values, so they are never merged
+        if CATEGORY_STRUCTURED_RE.match(value):
+            continue
+        fingerprint, compact = category_keys(value)
+        if not compact:
+            continue
+        value_keys[value] = compact
+        union(compact, '\x00' + fingerprint)
+    
+    # Fuzzy pass over distinct compact keys, blocked by q-grams. With k
+    # edits allowed two keys share all but about k * q of their q-grams, so
+    # they must share one of their k * q + 1 rarest grams (prefix filtering);
+    # only those grams are indexed and probed. Values that differ in their
+    # numbers ("Route 66"/"Route 67") stay separate, so the number sequence
+    # is part of every block key and such pairs never become candidates.
+    timed_out = False
+    numbers_of = {key: tuple(re.findall(r'\d+', key))
+                  for key in set(value_keys.values()) if len(key) >= CATEGORY_MIN_FUZZY_LENGTH}
+    group_sizes = Counter(numbers_of.values())
+    # A key alone with its numbers (typically an identifier) has no possible partner
+    keys = sorted(key for key, numbers in numbers_of.items() if group_sizes[numbers] > 1)
+    key_numbers = [numbers_of[key] for key in keys]
+    key_grams = [{key[g:g + CATEGORY_GRAM_SIZE] for g in range(len(key) - CATEGORY_GRAM_SIZE + 1)} for key in keys]
+    key_chars = [frozenset(key) for key in keys]
+    gram_frequency = Counter(gram for grams in key_grams for gram in grams)
+    postings = defaultdict(list)
+    for i, key in enumerate(keys):
+        if deadline and i % 256 == 0 and time.perf_counter() > deadline:
+            timed_out = True
+            break
+        # Most edits allowed against any partner this key could match
+        max_edits = int((1 - similarity) * len(key) / similarity)
+        if max_edits < 1:
+            continue
+        prefix = sorted(key_grams[i], key=lambda gram: (gram_frequency[gram], gram))
+        prefix = prefix[:max_edits * CATEGORY_GRAM_SIZE + 1]
+        
+        candidates = set()
+        for gram in prefix:
+            posting = postings[key_numbers[i], gram]
+            candidates.update(posting)
+            if len(posting) < CATEGORY_MAX_BLOCK:
+                posting.append(i)
+        
+        grams, chars = key_grams[i], key_chars[i]
+        for j in candidates:
+            other = keys[j]
+            longest = max(len(key), len(other))
+            max_distance = int((1 - similarity) * longest)
+            if max_distance < 1 or abs(len(key) - len(other)) > max_distance:
+                continue
+            # Count filter on the full gram sets before the costly edit distance
+            if len(grams & key_grams[j]) < longest - CATEGORY_GRAM_SIZE + 1 - max_distance * CATEGORY_GRAM_SIZE:
+                continue
+            # Each edit removes at most one character missing from the other key
+            if len(chars - key_chars[j]) > max_distance or len(key_chars[j] - chars) > max_distance:
+                continue
+            if bounded_levenshtein(key, other, max_distance) <= max_distance:
+                union(key, other)
+    
+    clusters = defaultdict(list)
+    for value, compact in value_keys.items():
+        clusters[find(compact)].append(value)
+    
+    mapping = {}
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        canonical = max(members, key=lambda member: value_counts[member])
+        for member in members:
+            if member != canonical:
+                mapping[member] = canonical
+    return mapping, timed_out
+
+def normalize_categories(rows, headers, options, column_types=None):
+    """Merge inconsistent spellings of category values within each column"""
+    if not options or not options.get('enabled', False):
+        return rows, {}
+    
+    similarity = options.get('similarity', 0.85)
+    time_budget = options.get('timeBudgetSeconds', 30)
+    columns = options.get('columns') or [h for h in headers if (column_types or {}).get(h, 'text') == 'text']
+    indices = [(headers.index(col), col) for col in columns if col in headers]
+    deadline = time.perf_counter() + time_budget
+    
+    changes_report = {
+        'values_changed': 0,
+        'timed_out': False,
+        'columns': {}
+    }
+    
+    mappings = {}
+    for idx, col in indices:
+        value_counts = Counter(row[idx] for row in rows if idx < len(row) and row[idx])
+        mapping, timed_out = cluster_categories(value_counts, similarity, deadline)
+        changes_report['timed_out'] = changes_report['timed_out'] or timed_out
+        changes_report['columns'][col] = {
+            'distinct_before': len(value_counts),
+            'distinct_after': len(value_counts) - len(mapping),
+            'values_merged': len(mapping),
+            'cells_changed': sum(value_counts[value] for value in mapping),
+            'timed_out': timed_out,
+        }
+        if mapping:
+            mappings[idx] = mapping
+    
+    if not mappings:
+        return rows, changes_report
+    
+    new_rows = []
+    for row in rows:
+        new_row = row
+        for idx, mapping in mappings.items():
+            if idx < len(row) and row[idx] in mapping:
+                if new_row is row:
+                    new_row = row.copy()
+                new_row[idx] = mapping[row[idx]]
+        new_rows.append(new_row)
+    
+    changes_report['values_changed'] = sum(report['cells_changed'] for report in changes_report['columns'].values())
+    return new_rows, changes_report
+
 def clean_string_fields(rows, headers, options):
     """Clean string fields based on options"""
     if not options or not options.get('enabled', False):
@@ -428,6 +1564,95 @@ def clean_string_fields(rows, headers, options):
     
     return new_rows, changes_report
 
+def row_key_digest(row, key_indices, ignore_case):
+    """Hash the normalized key tuple of a row into a 16-byte digest"""
+    parts = []
+    for idx in key_indices:
+        cell = row[idx] if idx < len(row) else ''
+        cell = str(cell).strip() if cell is not None else ''
+        parts.append(cell.lower() if ignore_case else cell)
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).digest()
+
+def find_duplicates_partitioned(rows, key_indices, ignore_case, keep, max_keys):
+    """Mark rows to keep by spilling (digest, row index) pairs to disk buckets.
+    
+    Each bucket holds a disjoint slice of the hash space, so it can be
+    deduplicated on its own with at most about max_keys entries in memory.
+    """
+    num_partitions = min(DEDUP_MAX_PARTITIONS, max(16, (len(rows) // max_keys) * 2 + 1))
+    keep_flags = bytearray(len(rows))
+    
+    with tempfile.TemporaryDirectory(prefix='parsepilot_dedup_') as spill_dir:
+        buckets = [open(os.path.join(spill_dir, f'bucket_{i}.bin'), 'w+b') for i in range(num_partitions)]
+        try:
+            for row_idx, row in enumerate(rows):
+                digest = row_key_digest(row, key_indices, ignore_case)
+                bucket = int.from_bytes(digest[:4], 'big') % num_partitions
+                buckets[bucket].write(DEDUP_RECORD.pack(digest, row_idx))
+            
+            for bucket in buckets:
+                bucket.seek(0)
+                chosen = {}
+                for digest, row_idx in DEDUP_RECORD.iter_unpack(bucket.read()):
+                    if keep == 'last' or digest not in chosen:
+                        chosen[digest] = row_idx
+                for row_idx in chosen.values():
+                    keep_flags[row_idx] = 1
+        finally:
+            for bucket in buckets:
+                bucket.close()
+    
+    return keep_flags, num_partitions
+
+def remove_duplicates(rows, headers, options):
+    """Remove duplicate rows on all columns or a key subset in a streaming pass"""
+    if not options or not options.get('enabled', False):
+        return rows, {}
+    
+    keep = options.get('keep', 'first')
+    ignore_case = options.get('ignoreCase', False)
+    key_columns = [col for col in options.get('columns', []) if col in headers]
+    key_indices = [headers.index(col) for col in key_columns] if key_columns else list(range(len(headers)))
+    budget_mb = options.get('memoryBudgetMb', 64)
+    max_keys = max(1, int(budget_mb * 1024 * 1024) // DEDUP_BYTES_PER_KEY)
+    
+    changes_report = {
+        'duplicates_removed': 0,
+        'key_columns': key_columns or 'all',
+        'keep': keep,
+        'spilled_partitions': 0
+    }
+    
+    # Keeping the last occurrence is keeping the first one of the reversed rows
+    ordered = reversed(rows) if keep == 'last' else rows
+    seen = set()
+    kept = []
+    spilled = False
+    for row in ordered:
+        digest = row_key_digest(row, key_indices, ignore_case)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        if len(seen) > max_keys:
+            spilled = True
+            break
+        kept.append(row)
+    seen = None
+    
+    if spilled:
+        kept = None
+        keep_flags, num_partitions = find_duplicates_partitioned(rows, key_indices, ignore_case, keep, max_keys)
+        new_rows = [row for row, flag in zip(rows, keep_flags) if flag]
+        changes_report['spilled_partitions'] = num_partitions
+    elif keep == 'last':
+        kept.reverse()
+        new_rows = kept
+    else:
+        new_rows = kept
+    
+    changes_report['duplicates_removed'] = len(rows) - len(new_rows)
+    return new_rows, changes_report
+
 def apply_filters(rows, headers, options):
     """Apply row filters based on options"""
     if not options:
@@ -466,11 +1691,993 @@ def apply_filters(rows, headers, options):
     
     return filtered_rows
 
-def process_csv(file_path, operation, options=None):
+class DescendingKey:
+    """Wrap a sort key so that it orders in reverse"""
+    __slots__ = ('key',)
+    
+    def __init__(self, key):
+        self.key = key
+    
+    def __lt__(self, other):
+        return other.key < self.key
+    
+    def __eq__(self, other):
+        return self.key == other.key
+
+def build_sort_key(rows, headers, sort_specs):
+    """Build a row key function from [{column, direction, type}] sort specs.
+    
+    Type 'auto' uses detect_column_types: numeric columns compare as numbers
+    (non-numeric cells sort after them), everything else lexically. Empty
+    cells sort last in either direction.
+    """
+    column_types = detect_column_types(rows, headers)
+    parts = []
+    for spec in sort_specs:
+        column = spec.get('column')
+        if column not in headers:
+            raise Exception(f"Unknown sort column: {column}")
+        sort_type = spec.get('type', 'auto')
+        if sort_type == 'auto':
+            sort_type = column_types.get(column, 'text')
+        parts.append((headers.index(column), sort_type == 'numeric', spec.get('direction', 'asc') == 'desc'))
+    
+    def sort_key(row):
+        key = []
+        for idx, numeric, descending in parts:
+            cell = row[idx] if idx < len(row) else ''
+            cell = cell or ''
+            # Missing (and, for numeric columns, unparseable) cells always sort last
+            rank = 0 if cell.strip() else 2
+            value = cell
+            if numeric and rank == 0:
+                try:
+                    value = float(cell)
+                except ValueError:
+                    rank = 1
+            key.append(rank)
+            key.append(DescendingKey(value) if descending else value)
+        return tuple(key)
+    
+    return sort_key
+
+def estimate_rows_bytes(rows):
+    """Rough in-memory size of a list of string rows, from a sample"""
+    if not rows:
+        return 0
+    sample = rows[:1000]
+    sample_bytes = sum(sum(len(cell) + SORT_BYTES_PER_CELL for cell in row) for row in sample)
+    return sample_bytes * len(rows) // len(sample)
+
+def write_sorted_run(rows, directory, run_index):
+    """Write one sorted run to a temp CSV file and return its path"""
+    path = os.path.join(directory, f'run_{run_index}.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows(rows)
+    return path
+
+def merge_runs(paths, sort_key):
+    """Lazily k-way merge sorted run files"""
+    files = [open(path, 'r', encoding='utf-8', newline='') for path in paths]
+    try:
+        yield from heapq.merge(*(csv.reader(f) for f in files), key=sort_key)
+    finally:
+        for f in files:
+            f.close()
+
+def sort_rows(rows, headers, sort_specs, memory_budget_mb=256):
+    """Yield rows ordered by the sort specs.
+    
+    Sorts in memory when the rows fit the budget. Otherwise falls back to an
+    external merge sort: the input list is consumed into sorted runs on disk,
+    which are then merged with a k-way heap merge.
+    """
+    sort_key = build_sort_key(rows, headers, sort_specs)
+    budget_bytes = int(memory_budget_mb * 1024 * 1024)
+    total_bytes = estimate_rows_bytes(rows)
+    
+    if total_bytes <= budget_bytes:
+        yield from sorted(rows, key=sort_key)
+        return
+    
+    run_rows = max(1000, len(rows) * budget_bytes // total_bytes // 2)
+    with tempfile.TemporaryDirectory(prefix='parsepilot_sort_') as spill_dir:
+        runs = []
+        for start in range(0, len(rows), run_rows):
+            run = sorted(rows[start:start + run_rows], key=sort_key)
+            runs.append(write_sorted_run(run, spill_dir, len(runs)))
+        # Free the in-memory copy now that every row is on disk
+        rows.clear()
+        
+        # Merge in passes so no more than SORT_MAX_MERGE_FANIN files are open at once
+        while len(runs) > SORT_MAX_MERGE_FANIN:
+            merged = []
+            for start in range(0, len(runs), SORT_MAX_MERGE_FANIN):
+                group = runs[start:start + SORT_MAX_MERGE_FANIN]
+                merged.append(write_sorted_run(merge_runs(group, sort_key), spill_dir, f'merge_{len(runs)}_{start}'))
+                for path in group:
+                    os.remove(path)
+            runs = merged
+        
+        yield from merge_runs(runs, sort_key)
+
+def join_key(row, key_indices, ignore_case):
+    """Digest of a row's join key, or None if any key cell is empty (never matches)"""
+    for idx in key_indices:
+        if idx >= len(row) or not row[idx].strip():
+            return None
+    return row_key_digest(row, key_indices, ignore_case)
+
+def join_output_row(left_row, right_row, left_width, right_keep):
+    """Left row padded to its header width followed by the kept right columns"""
+    row = left_row[:left_width] + [''] * (left_width - len(left_row))
+    if right_row is None:
+        return row + [''] * len(right_keep)
+    return row + [right_row[idx] if idx < len(right_row) else '' for idx in right_keep]
+
+def hash_join(build_rows, probe_rows, layout, write_row, stats, budget_bytes=None):
+    """Hash the build rows by key in memory and stream the probe rows through the table.
+    
+    layout describes both sides (key indices, which side is built, join
+    type). Unmatched rows of the preserved side of a left join are written
+    too; matches of one probe row come out in build-side order. Returns
+    False, before anything is written, if the build side outgrows
+    budget_bytes.
+    """
+    build, probe = ('left', 'right') if layout['build_is_left'] else ('right', 'left')
+    keep_build = layout['how'] == 'left' and layout['build_is_left']
+    keep_probe = layout['how'] == 'left' and not layout['build_is_left']
+    ignore_case = layout['ignore_case']
+    
+    def emit(probe_row, build_row):
+        if layout['build_is_left']:
+            left_row, right_row = build_row, probe_row
+        else:
+            left_row, right_row = probe_row, build_row
+        write_row(join_output_row(left_row, right_row, layout['left_width'], layout['right_keep']))
+    
+    # Entries are [row number, row, matched] so the build side can report matches
+    table = {}
+    unkeyed = []
+    build_counts = Counter()
+    used_bytes = 0
+    for row_number, row in enumerate(build_rows):
+        build_counts['rows'] += 1
+        key = join_key(row, layout[f'{build}_keys'], ignore_case)
+        if key is None:
+            build_counts['missing_key'] += 1
+            if not keep_build:
+                continue
+            unkeyed.append([row_number, row, False])
+        else:
+            table.setdefault(key, []).append([row_number, row, False])
+        if budget_bytes is not None:
+            used_bytes += sum(len(cell) + JOIN_BYTES_PER_CELL for cell in row)
+            if used_bytes > budget_bytes:
+                return False
+    
+    probe_keys = layout[f'{probe}_keys']
+    for row in probe_rows:
+        stats[f'{probe}_rows'] += 1
+        key = join_key(row, probe_keys, ignore_case)
+        matches = table.get(key) if key is not None else None
+        if matches:
+            stats[f'{probe}_rows_matched'] += 1
+            for entry in matches:
+                entry[2] = True
+                emit(row, entry[1])
+        else:
+            if key is None:
+                stats[f'{probe}_rows_missing_key'] += 1
+            if keep_probe:
+                emit(row, None)
+    
+    stats[f'{build}_rows'] += build_counts['rows']
+    stats[f'{build}_rows_missing_key'] += build_counts['missing_key']
+    unmatched = unkeyed
+    for entries in table.values():
+        for entry in entries:
+            if entry[2]:
+                stats[f'{build}_rows_matched'] += 1
+            elif keep_build:
+                unmatched.append(entry)
+    if keep_build:
+        # Preserved build rows without a match follow in their file order
+        unmatched.sort(key=lambda entry: entry[0])
+        for _, row, _ in unmatched:
+            emit(None, row)
+    return True
+
+def read_csv_rows(path, has_header=True):
+    """Yield the data rows of a CSV file, skipping its header if it has one"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        if has_header:
+            next(reader, None)
+        yield from reader
+
+def estimate_file_rows_bytes(path, sample_rows=1000):
+    """Rough in-memory size of a CSV file's rows in a join table, scaled up from a sample"""
+    sample = list(itertools.islice(read_csv_rows(path), sample_rows))
+    sample_chars = sum(sum(len(cell) + 1 for cell in row) for row in sample)
+    if not sample_chars:
+        return 0
+    sample_bytes = sum(sum(len(cell) + JOIN_BYTES_PER_CELL for cell in row) for row in sample)
+    return sample_bytes * os.path.getsize(path) // sample_chars
+
+def partition_join_side(path, key_indices, ignore_case, num_partitions, spill_dir, side):
+    """Spill a file's rows into per-partition CSV files by join key hash; returns their paths.
+    
+    Rows with an empty key go to partition 0 so the join there can still
+    count them and keep them for a left join.
+    """
+    paths = [os.path.join(spill_dir, f'{side}_{i}.csv') for i in range(num_partitions)]
+    files = [open(p, 'w', encoding='utf-8', newline='') for p in paths]
+    try:
+        writers = [csv.writer(f) for f in files]
+        for row in read_csv_rows(path):
+            key = join_key(row, key_indices, ignore_case)
+            partition = int.from_bytes(key[:4], 'big') % num_partitions if key is not None else 0
+            writers[partition].writerow(row)
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+def join_files(left_path, right_path, output_path, options):
+    """Join two CSV files on one or more key columns and write the result as CSV.
+    
+    The smaller file (by size) is hashed in memory and the larger one is
+    streamed through the table. If the build side exceeds the memory budget,
+    both files are partitioned to disk by key hash (grace hash join) and
+    each partition pair is joined in memory. Output rows follow the probe
+    file's order for an in-memory join and come partition by partition for
+    a grace join. Right key columns are dropped from the output and other
+    clashing right column names get a suffix.
+    Returns the join report with row counts and match rates per side.
+    """
+    how = options.get('how', 'left')
+    if how not in ('inner', 'left'):
+        raise Exception(f"Unsupported join type: {how}")
+    keys = options.get('keys') or []
+    if not keys:
+        raise Exception("Join requires at least one key column pair")
+    
+    with open(left_path, 'r', encoding='utf-8', newline='') as f:
+        left_headers = next(csv.reader(f), [])
+    with open(right_path, 'r', encoding='utf-8', newline='') as f:
+        right_headers = next(csv.reader(f), [])
+    for key in keys:
+        if key.get('left') not in left_headers:
+            raise Exception(f"Join key column not found in left file: {key.get('left')}")
+        if key.get('right') not in right_headers:
+            raise Exception(f"Join key column not found in right file: {key.get('right')}")
+    
+    left_keys = [left_headers.index(key['left']) for key in keys]
+    right_keys = [right_headers.index(key['right']) for key in keys]
+    right_keep = [idx for idx in range(len(right_headers)) if idx not in right_keys]
+    suffix = options.get('rightSuffix', '_right')
+    headers = list(left_headers)
+    for idx in right_keep:
+        name = right_headers[idx]
+        while name in headers:
+            name += suffix
+        headers.append(name)
+    
+    build_is_left = os.path.getsize(left_path) < os.path.getsize(right_path)
+    layout = {
+        'how': how,
+        'build_is_left': build_is_left,
+        'ignore_case': options.get('ignoreCase', False),
+        'left_keys': left_keys,
+        'right_keys': right_keys,
+        'left_width': len(left_headers),
+        'right_keep': right_keep,
+    }
+    build_path, probe_path = (left_path, right_path) if build_is_left else (right_path, left_path)
+    budget_bytes = int(options.get('memoryBudgetMb', 256) * 1024 * 1024)
+    stats = Counter()
+    num_partitions = 0
+    
+    with open(output_path, 'w', encoding='utf-8', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(headers)
+        
+        def write_row(row):
+            stats['output_rows'] += 1
+            writer.writerow(row)
+        
+        fitted = hash_join(read_csv_rows(build_path), read_csv_rows(probe_path), layout, write_row, stats, budget_bytes)
+        if not fitted:
+            # Aim for partitions about half the budget so key skew has some headroom
+            build_bytes = estimate_file_rows_bytes(build_path)
+            num_partitions = min(JOIN_MAX_PARTITIONS, max(16, build_bytes * 2 // budget_bytes + 1))
+            with tempfile.TemporaryDirectory(prefix='parsepilot_join_') as spill_dir:
+                left_parts = partition_join_side(left_path, left_keys, layout['ignore_case'], num_partitions, spill_dir, 'left')
+                right_parts = partition_join_side(right_path, right_keys, layout['ignore_case'], num_partitions, spill_dir, 'right')
+                for left_part, right_part in zip(left_parts, right_parts):
+                    build_part, probe_part = (left_part, right_part) if build_is_left else (right_part, left_part)
+                    # A skewed partition may still exceed the budget; it is joined in memory regardless
+                    hash_join(read_csv_rows(build_part, False), read_csv_rows(probe_part, False), layout, write_row, stats)
+    
+    def match_rate(side):
+        rows = stats[f'{side}_rows']
+        return round(stats[f'{side}_rows_matched'] / rows * 100, 2) if rows else 0
+    
+    return {
+        'how': how,
+        'keys': keys,
+        'strategy': 'in_memory' if fitted else 'grace',
+        'build_side': 'left' if build_is_left else 'right',
+        'partitions': num_partitions,
+        'left_rows': stats['left_rows'],
+        'right_rows': stats['right_rows'],
+        'left_rows_matched': stats['left_rows_matched'],
+        'right_rows_matched': stats['right_rows_matched'],
+        'left_match_rate': match_rate('left'),
+        'right_match_rate': match_rate('right'),
+        'left_rows_missing_key': stats['left_rows_missing_key'],
+        'right_rows_missing_key': stats['right_rows_missing_key'],
+        'output_rows': stats['output_rows'],
+        'left_columns': len(left_headers),
+        'right_columns': len(right_headers),
+        'output_columns': len(headers),
+    }
+
+def join_cleaning_report(join_report):
+    """Wrap a join report in the cleaning report layout the client renders"""
+    report = {
+        'summary': {
+            'original_rows': join_report['left_rows'],
+            'original_columns': join_report['left_columns'],
+            'final_rows': join_report['output_rows'],
+            'final_columns': join_report['output_columns'],
+        },
+        'operations_performed': ['join'],
+        'column_changes': {},
+        'missing_data_report': {},
+        'string_cleaning_report': {},
+        'filtering_report': {},
+        'join_report': join_report,
+    }
+    report['readable_summary'] = generate_cleaning_summary(report)
+    return report
+
+def run_cleaning_pipeline(rows, headers, cleaning_options, json_config=None):
+    """Apply JSON flattening and every enabled cleaning stage in order"""
+    # Initialize comprehensive cleaning report
+    cleaning_report = {
+        'summary': {
+            'original_rows': len(rows),
+            'original_columns': len(headers),
+            'final_rows': 0,
+            'final_columns': 0,
+        },
+        'operations_performed': [],
+        'column_changes': {},
+        'missing_data_report': {},
+        'string_cleaning_report': {},
+        'filtering_report': {},
+        'deduplication_report': {},
+        'outlier_report': {},
+        'category_report': {},
+        'date_report': {},
+        'json_flattening_report': {}
+    }
+    
+    # Apply JSON flattening first if config exists
+    if json_config:
+        rows, headers = flatten_json_fields(rows, headers, json_config)
+        cleaning_report['operations_performed'].append('json_flattening')
+        cleaning_report['json_flattening_report'] = {'columns_flattened': True}
+    
+    # Apply column normalization
+    normalize_opts = cleaning_options.get('normalizeColumns', {})
+    if normalize_opts:
+        headers, column_changes = normalize_column_names(headers, normalize_opts)
+        if column_changes:
+            cleaning_report['operations_performed'].append('column_normalization')
+            cleaning_report['column_changes'] = column_changes
+    
+    # Apply string cleaning
+    string_opts = cleaning_options.get('stringCleaning', {})
+    if string_opts and string_opts.get('enabled', False):
+        rows, string_report = clean_string_fields(rows, headers, string_opts)
+        cleaning_report['operations_performed'].append('string_cleaning')
+        cleaning_report['string_cleaning_report'] = string_report
+    
+    column_types = detect_column_types(rows, headers)
+    
+    # Rewrite mixed-format dates so later stages compare them consistently
+    date_opts = cleaning_options.get('dateNormalization', {})
+    if date_opts and date_opts.get('enabled', False):
+        rows, date_report, date_columns = normalize_dates(rows, headers, date_opts, column_types)
+        cleaning_report['operations_performed'].append('date_normalization')
+        cleaning_report['date_report'] = date_report
+        for col in date_columns:
+            column_types[col] = 'date'
+    
+    # Merge inconsistent category spellings before comparing rows
+    category_opts = cleaning_options.get('categoryNormalization', {})
+    if category_opts and category_opts.get('enabled', False):
+        rows, category_report = normalize_categories(rows, headers, category_opts, column_types)
+        cleaning_report['operations_performed'].append('category_normalization')
+        cleaning_report['category_report'] = category_report
+    
+    # Remove duplicate rows
+    dedup_opts = cleaning_options.get('deduplication', {})
+    if dedup_opts and dedup_opts.get('enabled', False):
+        rows, dedup_report = remove_duplicates(rows, headers, dedup_opts)
+        cleaning_report['operations_performed'].append('deduplication')
+        cleaning_report['deduplication_report'] = dedup_report
+    
+    # Handle numeric outliers before statistical fills so fills use robust statistics
+    outlier_bounds = None
+    outlier_opts = cleaning_options.get('outliers', {})
+    if outlier_opts and outlier_opts.get('enabled', False):
+        rows, headers, outlier_report, outlier_bounds = handle_outliers(rows, headers, outlier_opts, column_types)
+        cleaning_report['operations_performed'].append('outlier_handling')
+        cleaning_report['outlier_report'] = outlier_report
+    
+    # Apply missing data handling (types detected on the final column names)
+    missing_opts = cleaning_options.get('missingData', {})
+    if missing_opts:
+        rows, missing_report = handle_missing_data(rows, headers, missing_opts, column_types, outlier_bounds)
+        if missing_report.get('rows_removed', 0) > 0 or missing_report.get('cells_filled', 0) > 0:
+            cleaning_report['operations_performed'].append('missing_data_handling')
+            cleaning_report['missing_data_report'] = missing_report
+    
+    # Apply filtering
+    filter_opts = cleaning_options.get('filtering', {})
+    if filter_opts:
+        original_row_count = len(rows)
+        rows = apply_filters(rows, headers, filter_opts)
+        rows_filtered = original_row_count - len(rows)
+        if rows_filtered > 0:
+            cleaning_report['operations_performed'].append('row_filtering')
+            cleaning_report['filtering_report'] = {'rows_filtered': rows_filtered}
+    
+    # Update final counts
+    cleaning_report['summary']['final_rows'] = len(rows)
+    cleaning_report['summary']['final_columns'] = len(headers)
+    
+    # Generate human-readable summary
+    cleaning_report['readable_summary'] = generate_cleaning_summary(cleaning_report)
+    
+    return rows, headers, cleaning_report
+
+def find_affected_rows(rows, headers, cleaning_options, json_config):
+    """Cheaply flag rows the current missing-data, JSON or filter rules would touch.
+    
+    This only steers the sample towards interesting rows: a misclassified
+    row still lands in a sampled stratum, so per-row estimates stay
+    unbiased. The missing check therefore uses exact marker matches instead
+    of the full normalization done by handle_missing_data.
+    """
+    affected = bytearray(len(rows))
+    missing_cells = {''} | MISSING_MARKERS | {marker.upper() for marker in MISSING_MARKERS} \
+        | {marker.capitalize() for marker in MISSING_MARKERS}
+    
+    json_indices = []
+    if json_config and 'columns' in json_config:
+        for col_name, col_config in json_config['columns'].items():
+            if col_config.get('enabled', False) and col_name in headers:
+                json_indices.append(headers.index(col_name))
+    
+    missing_opts = cleaning_options.get('missingData') or {}
+    strategy = missing_opts.get('strategy', 'keep')
+    check_missing = strategy != 'keep' or (cleaning_options.get('filtering') or {}).get('removeEmptyRows', False)
+    missing_indices = None
+    if strategy == 'remove_specific':
+        missing_indices = [headers.index(col) for col in missing_opts.get('specificColumns', []) if col in headers]
+    
+    width = len(headers)
+    for row_idx, row in enumerate(rows):
+        if check_missing:
+            if missing_indices is None:
+                if len(row) < width or not missing_cells.isdisjoint(row):
+                    affected[row_idx] = 1
+                    continue
+            elif any(idx >= len(row) or row[idx] in missing_cells for idx in missing_indices):
+                affected[row_idx] = 1
+                continue
+        for idx in json_indices:
+            if idx < len(row) and row[idx][:1] == '{':
+                affected[row_idx] = 1
+                break
+    
+    # Filters reference normalized column names; evaluate them on the raw rows
+    filter_opts = cleaning_options.get('filtering')
+    if filter_opts:
+        filter_headers, _ = normalize_column_names(headers, cleaning_options.get('normalizeColumns', {}))
+        kept = {id(row) for row in apply_filters(rows, filter_headers, filter_opts)}
+        for row_idx, row in enumerate(rows):
+            if id(row) not in kept:
+                affected[row_idx] = 1
+    
+    return affected
+
+def report_counter(report, section, key):
+    """Read a numeric counter from a cleaning report, defaulting to 0"""
+    return (report.get(section) or {}).get(key, 0) or 0
+
+def count_exact_duplicates(rows, headers, cleaning_options, json_config):
+    """Duplicates removed from the full file, or None if earlier stages could change the keys.
+    
+    Deduplication runs after JSON flattening and the string, date and
+    category stages, so the raw rows only give the exact count when none of
+    those is enabled. Key columns use the normalized column names.
+    """
+    dedup_opts = cleaning_options.get('deduplication') or {}
+    if not dedup_opts.get('enabled', False):
+        return 0
+    if json_config or any((cleaning_options.get(stage) or {}).get('enabled', False)
+                          for stage in ('stringCleaning', 'dateNormalization', 'categoryNormalization')):
+        return None
+    dedup_headers, _ = normalize_column_names(headers, cleaning_options.get('normalizeColumns', {}))
+    _, dedup_report = remove_duplicates(rows, dedup_headers, dedup_opts)
+    return dedup_report['duplicates_removed']
+
+def removes_rows_per_row(cleaning_options):
+    """Whether any stage that removes rows one at a time (missing data, filters) is enabled"""
+    missing_strategy = (cleaning_options.get('missingData') or {}).get('strategy', 'keep')
+    return missing_strategy in ('remove', 'remove_specific') or bool(cleaning_options.get('filtering'))
+
+def preview_clean(rows, headers, cleaning_options, json_config=None, sample_size=5000, seed=42):
+    """Run the cleaning pipeline on a stratified sample of rows.
+    
+    Strata are the head of the file (shown in the preview, kept in full),
+    rows the current rules would affect, and all other rows. Each stratum is
+    sampled at random and split into replicate groups; per-row counters are
+    extrapolated per stratum and given 95% confidence intervals from the
+    spread between groups. Whole-file counters (PREVIEW_DATASET_COUNTERS)
+    are not extrapolated: duplicates are counted exactly when the raw rows
+    allow it, and the rest, together with final_rows when they remove rows,
+    are reported with a None estimate.
+    """
+    total_rows = len(rows)
+    if total_rows <= sample_size:
+        result_rows, result_headers, report = run_cleaning_pipeline(rows, headers, cleaning_options, json_config)
+        estimates = {}
+        for section, key, _ in PREVIEW_COUNTERS + PREVIEW_DATASET_COUNTERS:
+            value = report_counter(report, section, key)
+            estimates[f'{section}.{key}'] = {'estimate': value, 'low': value, 'high': value}
+        return result_rows, result_headers, report, {
+            'exact': True, 'totalRows': total_rows, 'sampleRows': total_rows, 'estimates': estimates
+        }
+    
+    rng = random.Random(seed)
+    head_count = min(PREVIEW_HEAD_ROWS, total_rows)
+    affected = find_affected_rows(rows, headers, cleaning_options, json_config)
+    strata = {
+        'head': list(range(head_count)),
+        'affected': [i for i in range(head_count, total_rows) if affected[i]],
+        'unaffected': [i for i in range(head_count, total_rows) if not affected[i]],
+    }
+    
+    # Affected rows get up to half the budget since they drive the counts
+    budget = max(sample_size - head_count, 2 * PREVIEW_REPLICATE_GROUPS)
+    affected_take = min(len(strata['affected']), max(budget // 2, budget - len(strata['unaffected'])))
+    takes = {
+        'head': head_count,
+        'affected': affected_take,
+        'unaffected': min(len(strata['unaffected']), budget - affected_take),
+    }
+    
+    samples = {}
+    for name, indices in strata.items():
+        chosen = indices if takes[name] >= len(indices) else rng.sample(indices, takes[name])
+        samples[name] = sorted(chosen)
+    
+    # Per-stratum, per-group counters for extrapolation
+    totals = {f'{section}.{key}': 0.0 for section, key, _ in PREVIEW_COUNTERS}
+    variances = dict.fromkeys(totals, 0.0)
+    for name, chosen in samples.items():
+        population, n = len(strata[name]), len(chosen)
+        if n == 0:
+            continue
+        weight = population / n
+        shuffled = chosen[:]
+        rng.shuffle(shuffled)
+        groups = [sorted(shuffled[g::PREVIEW_REPLICATE_GROUPS]) for g in range(PREVIEW_REPLICATE_GROUPS)]
+        groups = [group for group in groups if group]
+        group_counts = {name_: [] for name_ in totals}
+        for group in groups:
+            _, _, group_report = run_cleaning_pipeline([rows[i] for i in group], headers, cleaning_options, json_config)
+            for section, key, _ in PREVIEW_COUNTERS:
+                group_counts[f'{section}.{key}'].append(report_counter(group_report, section, key))
+        
+        fpc = 1 - n / population
+        for counter, counts in group_counts.items():
+            totals[counter] += weight * sum(counts)
+            g = len(counts)
+            if g > 1 and fpc > 0:
+                mean = sum(counts) / g
+                spread = sum((c - mean) ** 2 for c in counts) / (g - 1)
+                # Variance of the sum of g group totals, scaled to the stratum
+                variances[counter] += (weight ** 2) * g * spread * fpc
+    
+    sample_indices = sorted(i for chosen in samples.values() for i in chosen)
+    sample_rows = [rows[i] for i in sample_indices]
+    result_rows, result_headers, report = run_cleaning_pipeline(sample_rows, headers, cleaning_options, json_config)
+    
+    estimates = {}
+    for section, key, operation in PREVIEW_COUNTERS:
+        counter = f'{section}.{key}'
+        estimate = totals[counter]
+        margin = 1.96 * math.sqrt(variances[counter])
+        upper_bound = total_rows if key != 'cells_filled' and key != 'fields_cleaned' else math.inf
+        estimates[counter] = {
+            'estimate': round(estimate),
+            'low': max(0, math.floor(estimate - margin)),
+            'high': min(upper_bound, math.ceil(estimate + margin)),
+        }
+    
+    duplicates = count_exact_duplicates(rows, headers, cleaning_options, json_config)
+    outlier_opts = cleaning_options.get('outliers') or {}
+    drops_outliers = outlier_opts.get('enabled', False) and outlier_opts.get('strategy', 'flag') == 'drop'
+    unavailable = {'estimate': None, 'low': None, 'high': None}
+    for section, key, _ in PREVIEW_DATASET_COUNTERS:
+        counter = f'{section}.{key}'
+        if not report.get(section) or (key == 'rows_dropped' and not drops_outliers):
+            # Stage disabled or not dropping rows, so there is nothing to count
+            estimates[counter] = {'estimate': 0, 'low': 0, 'high': 0}
+        elif counter == 'deduplication_report.duplicates_removed' and duplicates is not None:
+            estimates[counter] = {'estimate': duplicates, 'low': duplicates, 'high': duplicates}
+        else:
+            estimates[counter] = dict(unavailable)
+    # Rows removed by whole-file stages make the extrapolated final_rows meaningless
+    if report.get('deduplication_report') or drops_outliers:
+        if duplicates is not None and not drops_outliers and not removes_rows_per_row(cleaning_options):
+            exact_rows = total_rows - duplicates
+            estimates['summary.final_rows'] = {'estimate': exact_rows, 'low': exact_rows, 'high': exact_rows}
+        else:
+            estimates['summary.final_rows'] = dict(unavailable)
+    
+    not_estimated = []
+    for section, key, operation in PREVIEW_COUNTERS + PREVIEW_DATASET_COUNTERS:
+        counter = f'{section}.{key}'
+        if estimates[counter]['estimate'] is None:
+            not_estimated.append(key.replace('_', ' '))
+            # The sample's own count would read as a count for the whole file
+            if section == 'summary':
+                report[section][key] = None
+            else:
+                report[section].pop(key, None)
+            continue
+        # Show extrapolated counts in the report itself
+        report.setdefault(section, {})
+        if estimates[counter]['estimate'] > 0 or key in report[section]:
+            report[section][key] = estimates[counter]['estimate']
+        if operation and estimates[counter]['estimate'] > 0 and operation not in report['operations_performed']:
+            report['operations_performed'].append(operation)
+    
+    report['summary']['original_rows'] = total_rows
+    report['readable_summary'] = [f"Estimated from a sample of {len(sample_rows)} of {total_rows} rows"]
+    if not_estimated:
+        report['readable_summary'].append(f"Needs the full file, not estimated: {', '.join(not_estimated)}")
+    report['readable_summary'] += generate_cleaning_summary(report)
+    
+    return result_rows, result_headers, report, {
+        'exact': False,
+        'totalRows': total_rows,
+        'sampleRows': len(sample_rows),
+        'strata': {name: {'rows': len(strata[name]), 'sampled': len(samples[name])} for name in strata},
+        'estimates': estimates,
+    }
+
+def write_export(rows, headers, format_type, include_headers, output):
+    """Stream rows to a text stream in the requested export format"""
+    if format_type in ('csv', 'xlsx'):
+        # xlsx is written as CSV for now, as Excel isn't implemented
+        writer = csv.writer(output)
+        if include_headers:
+            writer.writerow(headers)
+        writer.writerows(rows)
+    elif format_type == 'json':
+        # Same layout as json.dumps(records, indent=2), one record at a time
+        first = True
+        for row in rows:
+            row_dict = {}
+            for i, header in enumerate(headers):
+                row_dict[header] = row[i] if i < len(row) else ''
+            record = json.dumps(row_dict, indent=2).replace('\n', '\n  ')
+            output.write(('[\n  ' if first else ',\n  ') + record)
+            first = False
+        output.write('[]' if first else '\n]')
+    else:
+        raise Exception(f"Unsupported export format: {format_type}")
+
+def quote_identifier(name):
+    """Quote a SQLite identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def sqlite_column_names(headers):
+    """Make header names usable as distinct SQLite column names"""
+    names = []
+    seen = set()
+    for i, header in enumerate(headers):
+        name = header.strip() or f"column_{i}"
+        candidate = name
+        suffix = 2
+        while candidate.lower() in seen:
+            candidate = f"{name}_{suffix}"
+            suffix += 1
+        seen.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+def sqlite_record(row, numeric):
+    """Pad or trim a row to the table width; empty numeric cells become NULL"""
+    width = len(numeric)
+    record = list(row[:width]) + [None] * (width - len(row))
+    for i in range(width):
+        # NUMERIC affinity converts the other numeric cells
+        if numeric[i] and record[i] is not None and not str(record[i]).strip():
+            record[i] = None
+    return record
+
+def write_sqlite_export(rows, headers, db_path, column_types, table_name='data', index_columns=None):
+    """Bulk load rows into a typed SQLite table.
+    
+    Rows are consumed lazily in executemany batches inside one transaction,
+    with journaling and sync disabled for the load. Indexes are created
+    after the data is in place.
+    """
+    # Check index columns before any rows are loaded so a typo fails fast
+    for column in index_columns or []:
+        if column not in headers:
+            raise Exception(f"Unknown index column: {column}")
+    
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    
+    names = sqlite_column_names(headers)
+    numeric = [column_types.get(header) == 'numeric' for header in headers]
+    width = len(headers)
+    
+    column_defs = ', '.join(
+        f"{quote_identifier(name)} {'NUMERIC' if is_numeric else 'TEXT'}"
+        for name, is_numeric in zip(names, numeric)
+    )
+    placeholders = ', '.join('?' * width)
+    insert_sql = f"INSERT INTO {quote_identifier(table_name)} VALUES ({placeholders})"
+    
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -65536")
+        
+        conn.execute("BEGIN")
+        conn.execute(f"CREATE TABLE {quote_identifier(table_name)} ({column_defs})")
+        row_count = 0
+        batch = []
+        for row in rows:
+            batch.append(sqlite_record(row, numeric))
+            if len(batch) >= SQLITE_BATCH_ROWS:
+                conn.executemany(insert_sql, batch)
+                row_count += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(insert_sql, batch)
+            row_count += len(batch)
+        
+        indexed = []
+        for column in index_columns or []:
+            name = names[headers.index(column)]
+            conn.execute(
+                f"CREATE INDEX {quote_identifier(f'idx_{table_name}_{name}')} "
+                f"ON {quote_identifier(table_name)} ({quote_identifier(name)})"
+            )
+            indexed.append(name)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    
+    return {'table': table_name, 'rows': row_count, 'columns': names, 'indexes': indexed}
+
+def source_fingerprint(file_path):
+    """Size and modification time identifying one version of a file"""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def build_query_store(file_path, store_path):
+    """Load a CSV into a SQLite store with all detected JSON fields flattened"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        rows = list(reader)
+    
+    json_columns, json_fields = detect_json_columns(rows, headers)
+    json_config = {'columns': {
+        column: {'enabled': True, 'fields': {field: True for field in json_fields[column]}}
+        for column in json_columns
+    }}
+    rows, headers = flatten_json_fields(rows, headers, json_config)
+    column_types = detect_column_types(rows, headers)
+    
+    # Build beside the final path and swap in, so concurrent readers never see a partial store
+    tmp_path = f"{store_path}.{os.getpid()}.tmp"
+    info = write_sqlite_export(rows, headers, tmp_path, column_types)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE _source (fingerprint TEXT)")
+        conn.execute("INSERT INTO _source VALUES (?)", (source_fingerprint(file_path),))
+        conn.execute("CREATE TABLE _filter_usage (column_name TEXT PRIMARY KEY, uses INTEGER)")
+        # Kept so appended rows can be flattened the same way
+        conn.execute("CREATE TABLE _json_config (config TEXT)")
+        conn.execute("INSERT INTO _json_config VALUES (?)", (json.dumps(json_config),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, store_path)
+    return info
+
+def ensure_query_store(file_path, store_path):
+    """Reuse the store for this file unless the file changed; returns True if rebuilt"""
+    if os.path.exists(store_path):
+        try:
+            conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+            try:
+                stored = conn.execute("SELECT fingerprint FROM _source").fetchone()
+            finally:
+                conn.close()
+            if stored and stored[0] == source_fingerprint(file_path):
+                return False
+        except sqlite3.Error:
+            pass
+    build_query_store(file_path, store_path)
+    return True
+
+def extend_query_store(store_path, previous_fingerprint, fingerprint, rows, headers, previous_rows):
+    """Insert appended rows into the query store if it was current before the append.
+    
+    Column types and flattened JSON fields stay as they were when the store
+    was built. Returns 'extended', 'absent' if no store exists yet, or
+    'removed' if the store was stale or can't be extended, so the next
+    query rebuilds it.
+    """
+    if not os.path.exists(store_path):
+        return 'absent'
+    # JSON fields are detected from the first rows, which change while the file is short
+    if previous_rows < JSON_DETECT_SAMPLE_ROWS:
+        os.remove(store_path)
+        return 'removed'
+    try:
+        conn = sqlite3.connect(store_path, timeout=5)
+        try:
+            stored = conn.execute("SELECT fingerprint FROM _source").fetchone()
+            config = conn.execute("SELECT config FROM _json_config").fetchone()
+            declared = [column[2] for column in conn.execute("PRAGMA table_info(data)")]
+            if stored and config and stored[0] == previous_fingerprint:
+                rows, headers = flatten_json_fields(rows, headers, json.loads(config[0]))
+                if len(headers) == len(declared):
+                    numeric = [column_type.upper() == 'NUMERIC' for column_type in declared]
+                    placeholders = ', '.join('?' * len(declared))
+                    conn.executemany(
+                        f"INSERT INTO data VALUES ({placeholders})",
+                        (sqlite_record(row, numeric) for row in rows)
+                    )
+                    conn.execute("UPDATE _source SET fingerprint = ?", (fingerprint,))
+                    conn.commit()
+                    return 'extended'
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+    os.remove(store_path)
+    return 'removed'
+
+def filtered_columns(sql, columns):
+    """Columns compared against a value in a query's WHERE clause"""
+    where = re.split(r'\bwhere\b', sql, maxsplit=1, flags=re.IGNORECASE)
+    if len(where) < 2:
+        return []
+    clause = where[1]
+    found = []
+    for column in columns:
+        pattern = r'(?<![\w"])"?' + re.escape(column) + r'"?\s*(=|<|>|!=|<>|\bin\b|\blike\b|\bbetween\b|\bis\b)'
+        if re.search(pattern, clause, flags=re.IGNORECASE):
+            found.append(column)
+    return found
+
+def record_filter_usage(store_path, sql):
+    """Count filtered columns, index those that are filtered often and return the indexes"""
+    conn = sqlite3.connect(store_path, timeout=5)
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(data)")]
+        indexed = {row[1] for row in conn.execute("PRAGMA index_list(data)")}
+        for column in filtered_columns(sql, columns):
+            conn.execute(
+                "INSERT INTO _filter_usage VALUES (?, 1) "
+                "ON CONFLICT(column_name) DO UPDATE SET uses = uses + 1",
+                (column,)
+            )
+            uses = conn.execute("SELECT uses FROM _filter_usage WHERE column_name = ?", (column,)).fetchone()[0]
+            index_name = f"idx_data_{column}"
+            if uses >= QUERY_INDEX_THRESHOLD and index_name not in indexed:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier(index_name)} ON data ({quote_identifier(column)})")
+                indexed.add(index_name)
+        conn.commit()
+    finally:
+        conn.close()
+    return sorted(indexed)
+
+def read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    """Allow only statements that read data"""
+    if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE):
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+def run_query(file_path, store_path, sql, limit=QUERY_DEFAULT_LIMIT, timeout_ms=QUERY_DEFAULT_TIMEOUT_MS):
+    """Run a read-only SQL query against the file's store (table name: data)"""
+    limit = max(1, min(int(limit), QUERY_MAX_LIMIT))
+    rebuilt = ensure_query_store(file_path, store_path)
+    indexes = record_filter_usage(store_path, sql)
+    
+    conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+    start = time.perf_counter()
+    deadline = start + timeout_ms / 1000
+    try:
+        conn.execute("PRAGMA query_only = ON")
+        conn.set_authorizer(read_only_authorizer)
+        # Abort the statement once the deadline passes
+        conn.set_progress_handler(lambda: 1 if time.perf_counter() > deadline else 0, 10000)
+        try:
+            cursor = conn.execute(sql)
+            rows = cursor.fetchmany(limit + 1)
+        except sqlite3.OperationalError as e:
+            if time.perf_counter() > deadline:
+                raise Exception(f"Query exceeded the {timeout_ms} ms time limit")
+            raise Exception(f"Query failed: {e}")
+        except sqlite3.DatabaseError as e:
+            raise Exception(f"Query failed: {e}")
+        columns = [description[0] for description in cursor.description or []]
+    finally:
+        conn.close()
+    
+    return {
+        'columns': columns,
+        'rows': [list(row) for row in rows[:limit]],
+        'rowCount': min(len(rows), limit),
+        'truncated': len(rows) > limit,
+        'elapsedMs': (time.perf_counter() - start) * 1000,
+        'store': {'rebuilt': rebuilt, 'indexes': indexes},
+    }
+
+def process_csv(file_path, operation, options=None, columnar=False):
     """Main processing function"""
     try:
         if operation == 'analyze':
-            return analyze_csv(file_path)
+            return analyze_csv(file_path, (options or {}).get('statsPath'))
+        
+        if operation == 'append':
+            options = options or {}
+            if not options.get('appendPath') or not options.get('statsPath'):
+                raise Exception("Append requires appendPath and statsPath")
+            return append_csv(file_path, options['appendPath'], options['statsPath'], options.get('storePath'))
+        
+        if operation == 'query':
+            options = options or {}
+            if not options.get('sql') or not options.get('storePath'):
+                raise Exception("Query requires sql and storePath")
+            return run_query(
+                file_path, options['storePath'], options['sql'],
+                options.get('limit', QUERY_DEFAULT_LIMIT), options.get('timeoutMs', QUERY_DEFAULT_TIMEOUT_MS)
+            )
+        
+        # Joins stream both files into a new CSV, which is then analyzed like an upload
+        if operation == 'join':
+            options = options or {}
+            if not options.get('rightPath') or not options.get('outputPath'):
+                raise Exception("Join requires rightPath and outputPath")
+            join_report = join_files(file_path, options['rightPath'], options['outputPath'], options)
+            result = analyze_csv(options['outputPath'])
+            result['cleaningReport'] = join_cleaning_report(join_report)
+            return result
         
         # Read CSV file
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -485,135 +2692,49 @@ def process_csv(file_path, operation, options=None):
         elif operation == 'clean' and options:
             cleaning_options = options.get('cleaningOptions', {})
             json_config = options.get('jsonConfig')
-            
-            # Initialize comprehensive cleaning report
-            cleaning_report = {
-                'summary': {
-                    'original_rows': len(rows),
-                    'original_columns': len(headers),
-                    'final_rows': 0,
-                    'final_columns': 0,
-                },
-                'operations_performed': [],
-                'column_changes': {},
-                'missing_data_report': {},
-                'string_cleaning_report': {},
-                'filtering_report': {},
-                'json_flattening_report': {}
-            }
-            
-            # Detect column types for smart processing
-            column_types = detect_column_types(rows, headers)
-            
-            # Apply JSON flattening first if config exists
-            if json_config:
-                rows, headers = flatten_json_fields(rows, headers, json_config)
-                cleaning_report['operations_performed'].append('json_flattening')
-                cleaning_report['json_flattening_report'] = {'columns_flattened': True}
-            
-            # Apply column normalization
-            normalize_opts = cleaning_options.get('normalizeColumns', {})
-            if normalize_opts:
-                headers, column_changes = normalize_column_names(headers, normalize_opts)
-                if column_changes:
-                    cleaning_report['operations_performed'].append('column_normalization')
-                    cleaning_report['column_changes'] = column_changes
-            
-            # Apply string cleaning
-            string_opts = cleaning_options.get('stringCleaning', {})
-            if string_opts and string_opts.get('enabled', False):
-                rows, string_report = clean_string_fields(rows, headers, string_opts)
-                cleaning_report['operations_performed'].append('string_cleaning')
-                cleaning_report['string_cleaning_report'] = string_report
-            
-            # Apply missing data handling
-            missing_opts = cleaning_options.get('missingData', {})
-            if missing_opts:
-                rows, missing_report = handle_missing_data(rows, headers, missing_opts, column_types)
-                if missing_report.get('rows_removed', 0) > 0 or missing_report.get('cells_filled', 0) > 0:
-                    cleaning_report['operations_performed'].append('missing_data_handling')
-                    cleaning_report['missing_data_report'] = missing_report
-            
-            # Apply filtering
-            filter_opts = cleaning_options.get('filtering', {})
-            if filter_opts:
-                original_row_count = len(rows)
-                rows = apply_filters(rows, headers, filter_opts)
-                rows_filtered = original_row_count - len(rows)
-                if rows_filtered > 0:
-                    cleaning_report['operations_performed'].append('row_filtering')
-                    cleaning_report['filtering_report'] = {'rows_filtered': rows_filtered}
-            
-            # Update final counts
-            cleaning_report['summary']['final_rows'] = len(rows)
-            cleaning_report['summary']['final_columns'] = len(headers)
-            
-            # Generate human-readable summary
-            cleaning_report['readable_summary'] = generate_cleaning_summary(cleaning_report)
+            rows, headers, cleaning_report = run_cleaning_pipeline(rows, headers, cleaning_options, json_config)
+        
+        elif operation == 'preview' and options:
+            cleaning_options = options.get('cleaningOptions', {})
+            json_config = options.get('jsonConfig')
+            rows, headers, cleaning_report, sample_info = preview_clean(
+                rows, headers, cleaning_options, json_config, options.get('sampleSize', 5000)
+            )
         
         elif operation == 'export' and options:
             format_type = options.get('format', 'csv')
             include_headers = options.get('includeHeaders', True)
-            cleaning_options = options.get('cleaningOptions')
+            cleaning_options = options.get('cleaningOptions') or {}
             json_config = options.get('jsonConfig')
             
             # Apply all processing steps
-            if json_config:
-                rows, headers = flatten_json_fields(rows, headers, json_config)
+            rows, headers, _ = run_cleaning_pipeline(rows, headers, cleaning_options, json_config)
             
-            if cleaning_options:
-                # Apply column normalization
-                normalize_opts = cleaning_options.get('normalizeColumns', {})
-                if normalize_opts:
-                    headers, _ = normalize_column_names(headers, normalize_opts)
-                
-                # Apply string cleaning
-                string_opts = cleaning_options.get('stringCleaning', {})
-                if string_opts and string_opts.get('enabled', False):
-                    rows, _ = clean_string_fields(rows, headers, string_opts)
-                
-                # Apply missing data handling
-                missing_opts = cleaning_options.get('missingData', {})
-                if missing_opts:
-                    column_types = detect_column_types(rows, headers)
-                    rows, _ = handle_missing_data(rows, headers, missing_opts, column_types)
-                
-                # Apply filtering
-                filter_opts = cleaning_options.get('filtering', {})
-                if filter_opts:
-                    rows = apply_filters(rows, headers, filter_opts)
+            # Column types come from the cleaned rows, before sorting consumes them
+            column_types = detect_column_types(rows, headers) if format_type == 'sqlite' else None
+            
+            # Optional multi-key ordering, streamed straight into the writer
+            sort_specs = options.get('sort') or []
+            if sort_specs:
+                rows = sort_rows(rows, headers, sort_specs, options.get('sortMemoryBudgetMb', 256))
+            
+            # SQLite is binary, so it is written to a path chosen by the caller
+            if format_type == 'sqlite':
+                output_path = options.get('outputPath')
+                if not output_path:
+                    raise Exception("SQLite export requires an outputPath")
+                sqlite_info = write_sqlite_export(
+                    rows, headers, output_path, column_types,
+                    options.get('sqliteTable', 'data'), options.get('sqliteIndexes')
+                )
+                return {'exportPath': output_path, 'sqlite': sqlite_info}
             
             # Export data
-            if format_type == 'csv':
-                import io
-                output = io.StringIO()
-                writer = csv.writer(output)
-                if include_headers:
-                    writer.writerow(headers)
-                writer.writerows(rows)
-                export_data = output.getvalue()
-            elif format_type == 'json':
-                data = []
-                for row in rows:
-                    row_dict = {}
-                    for i, header in enumerate(headers):
-                        value = row[i] if i < len(row) else ''
-                        row_dict[header] = value
-                    data.append(row_dict)
-                export_data = json.dumps(data, indent=2)
-            elif format_type == 'xlsx':
-                # For now, return CSV format as Excel isn't implemented
-                import io
-                output = io.StringIO()
-                writer = csv.writer(output)
-                if include_headers:
-                    writer.writerow(headers)
-                writer.writerows(rows)
-                export_data = output.getvalue()
-            else:
-                raise Exception(f"Unsupported export format: {format_type}")
+            import io
+            output = io.StringIO()
+            write_export(rows, headers, format_type, include_headers, output)
             
-            return {'exportData': export_data}
+            return {'exportData': output.getvalue()}
         
         # Return processed data and preview
         preview_rows = rows[:20]
@@ -646,16 +2767,32 @@ def process_csv(file_path, operation, options=None):
             }
         }
         
+        if columnar:
+            width = len(headers)
+            processed_data = {
+                'columns': headers,
+                'rows': [row if len(row) <= width else row[:width] for row in rows]
+            }
+        else:
+            processed_data = [dict(zip(headers, row)) for row in rows]
+        
         result = {
-            'processedData': [dict(zip(headers, row)) for row in rows],
+            'processedData': processed_data,
             'preview': preview,
             'stats': stats,
             'columnNames': headers
         }
         
         # Include cleaning report if available
-        if operation == 'clean' and 'cleaning_report' in locals():
+        if operation in ('clean', 'preview') and 'cleaning_report' in locals():
             result['cleaningReport'] = cleaning_report
+        
+        # Preview stats describe the sample; report the full row count and
+        # estimates (totalRows is None when it can't be estimated from a sample)
+        if operation == 'preview' and 'sample_info' in locals():
+            result['sample'] = sample_info
+            result['stats']['totalRows'] = sample_info['estimates']['summary.final_rows']['estimate']
+            del result['processedData']
             
         return result
         
@@ -669,6 +2806,8 @@ def generate_cleaning_summary(report):
     # Basic stats
     original_rows = report['summary']['original_rows']
     final_rows = report['summary']['final_rows']
+    if final_rows is None:
+        final_rows = 'unknown'
     original_cols = report['summary']['original_columns']
     final_cols = report['summary']['final_columns']
     
@@ -678,6 +2817,17 @@ def generate_cleaning_summary(report):
     if report['operations_performed']:
         summary.append(f"Operations applied: {', '.join(report['operations_performed'])}")
     
+    # Join
+    if report.get('join_report'):
+        join = report['join_report']
+        summary.append(f"Left rows matched: {join['left_rows_matched']} of {join['left_rows']} ({join['left_match_rate']}%)")
+        summary.append(f"Right rows matched: {join['right_rows_matched']} of {join['right_rows']} ({join['right_match_rate']}%)")
+        missing_keys = join['left_rows_missing_key'] + join['right_rows_missing_key']
+        if missing_keys > 0:
+            summary.append(f"Rows with an empty join key: {missing_keys}")
+        if join['strategy'] == 'grace':
+            summary.append(f"Build side exceeded the memory budget; joined in {join['partitions']} partitions")
+    
     # Column changes
     if report['column_changes']:
         summary.append(f"Column names normalized: {len(report['column_changes'])} columns renamed")
@@ -696,6 +2846,36 @@ def generate_cleaning_summary(report):
         if string_clean.get('fields_cleaned', 0) > 0:
             summary.append(f"String fields cleaned: {string_clean['fields_cleaned']}")
     
+    # Date normalization
+    if report.get('date_report'):
+        dates = report['date_report']
+        if dates.get('values_normalized', 0) > 0:
+            summary.append(f"Date values normalized: {dates['values_normalized']}")
+        if dates.get('unparseable', 0) > 0:
+            summary.append(f"Unparseable date values: {dates['unparseable']}")
+        if dates.get('time_dropped', 0) > 0:
+            summary.append(f"Date values with time dropped by the output format: {dates['time_dropped']}")
+    
+    # Category normalization
+    if report.get('category_report'):
+        changed = report['category_report'].get('values_changed', 0)
+        if changed > 0:
+            summary.append(f"Category values normalized: {changed}")
+    
+    # Deduplication
+    if report.get('deduplication_report'):
+        removed = report['deduplication_report'].get('duplicates_removed', 0)
+        if removed > 0:
+            summary.append(f"Duplicate rows removed: {removed}")
+    
+    # Outliers
+    if report.get('outlier_report'):
+        outliers = report['outlier_report']
+        if outliers.get('outliers_found', 0) > 0:
+            summary.append(f"Outliers found ({outliers['method']}, {outliers['strategy']}): {outliers['outliers_found']}")
+        if outliers.get('rows_dropped', 0) > 0:
+            summary.append(f"Rows dropped as outliers: {outliers['rows_dropped']}")
+    
     # Filtering
     if report['filtering_report']:
         filtered = report['filtering_report'].get('rows_filtered', 0)
@@ -704,20 +2884,66 @@ def generate_cleaning_summary(report):
     
     return summary
 
+def peak_rss_bytes():
+    """Peak resident set size of this process in bytes, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def write_frame(stream, frame_type, payload):
+    """Write one frame: 1-byte type, 4-byte big-endian length, JSON payload"""
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    stream.write(frame_type + struct.pack('>I', len(data)) + data)
+
+def write_framed_result(result, stream):
+    """Write a result in the compact wire format.
+    
+    The metadata frame carries every result key except the processed rows,
+    which follow as row-array batches keyed by a single column-name table.
+    The end frame carries process stats such as peak memory.
+    """
+    processed = result.get('processedData')
+    meta = {key: value for key, value in result.items() if key != 'processedData'}
+    if isinstance(processed, dict):
+        meta['processedDataColumns'] = processed['columns']
+    write_frame(stream, FRAME_META, meta)
+    
+    if isinstance(processed, dict):
+        rows = processed['rows']
+        for start in range(0, len(rows), FRAME_ROW_BATCH):
+            write_frame(stream, FRAME_ROWS, rows[start:start + FRAME_ROW_BATCH])
+    
+    write_frame(stream, FRAME_END, {'peakRssBytes': peak_rss_bytes()})
+    stream.flush()
+
 if __name__ == "__main__":
     try:
-        if len(sys.argv) < 3:
-            raise Exception("Usage: python simple_csv_processor.py <file_path> <operation> [options]")
+        args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+        flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+        
+        if len(args) < 2:
+            raise Exception("Usage: python simple_csv_processor.py <file_path> <operation> [options] [--wire-format=json|frames]")
         
-        file_path = sys.argv[1]
-        operation = sys.argv[2]
+        file_path = args[0]
+        operation = args[1]
         options = None
+        wire_format = 'json'
         
-        if len(sys.argv) > 3:
-            options = json.loads(sys.argv[3])
+        if len(args) > 2:
+            options = json.loads(args[2])
         
-        result = process_csv(file_path, operation, options)
-        print(json.dumps(result))
+        for flag in flags:
+            if flag.startswith('--wire-format='):
+                wire_format = flag.split('=', 1)[1]
+        
+        if wire_format == 'frames':
+            result = process_csv(file_path, operation, options, columnar=True)
+            write_framed_result(result, sys.stdout.buffer)
+        else:
+            result = process_csv(file_path, operation, options)
+            print(json.dumps(result))
         
     except Exception as e:
         print(json.dumps({"error": str(e)}), file=sys.stderr)
@@ -1,8 +1,11 @@
 import type { Express } from "express";
 import { createServer, type Server } from "http";
 import multer from "multer";
-import { storage } from "./storage";
-import { insertCsvFileSchema, cleaningOptionsSchema, jsonExtractionConfigSchema } from "@shared/schema";
+import { storage, DiskStorage } from "./storage";
+import { FrameDecoder } from "./wire-format";
+import { registry, processorMetrics, collectServerMetrics } from "./metrics";
+import { logEvent } from "./logging";
+import { insertCsvFileSchema, cleaningOptionsSchema, jsonExtractionConfigSchema, exportSortSchema, querySchema, joinSchema } from "@shared/schema";
 import { z } from "zod";
 import { spawn } from "child_process";
 import path from "path";
@@ -10,7 +13,7 @@ import fs from "fs";
 
 // Ensure uploads directory exists - use tmp directory in production
 import { mkdirSync } from 'fs';
-import { tmpdir } from 'os';
+import { tmpdir, cpus } from 'os';
 
 const uploadsDir = process.env.NODE_ENV === 'production' ? path.join(tmpdir(), 'uploads') : 'uploads';
 try {
@@ -36,15 +39,12 @@ export async function registerRoutes(app: Express): Promise<Server> {
         return res.status(400).json({ error: "Only CSV files are allowed" });
       }
 
-      // Process CSV file with Python script
-      console.log('Starting Python analysis...');
-      console.log('File path:', req.file.path);
-      console.log('File size:', req.file.size);
-      
-      const pythonResult = await processCsvWithPython(req.file.path, 'analyze');
+      // Process CSV file with Python script; the stats state lets appends update stats incrementally
+      const pythonResult = await processCsvWithPython(req.file.path, 'analyze', {
+        statsPath: `${req.file.path}.stats.json`,
+      });
       
       if (!pythonResult.success) {
-        console.error('Python processing failed:', pythonResult.error);
         return res.status(400).json({ 
           error: `Processing failed: ${pythonResult.error}`,
           details: {
@@ -113,13 +113,13 @@ export async function registerRoutes(app: Express): Promise<Server> {
         return res.status(404).json({ error: "File not found" });
       }
 
-      const processedData = await storage.getProcessedData(fileId);
+      const processedData = await storage.getProcessedDataMeta(fileId);
       if (!processedData) {
         return res.status(404).json({ error: "No data found for file" });
       }
 
       // Process with Python script
-      const filePath = path.join('uploads', file.filename);
+      const filePath = path.join(uploadsDir, file.filename);
       const pythonResult = await processCsvWithPython(filePath, 'flatten', { config });
 
       if (!pythonResult.success) {
@@ -154,7 +154,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         return res.status(404).json({ error: "File not found" });
       }
 
-      const processedData = await storage.getProcessedData(fileId);
+      const processedData = await storage.getProcessedDataMeta(fileId);
       if (!processedData) {
         return res.status(404).json({ error: "No data found for file" });
       }
@@ -180,6 +180,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         processedData: updated,
         preview: pythonResult.data.preview,
         stats: pythonResult.data.stats,
+        cleaningReport: pythonResult.data.cleaningReport,
       });
     } catch (error) {
       console.error("Clean error:", error);
@@ -187,18 +188,57 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }
   });
 
+  // Preview cleaning on a stratified sample (does not update stored data)
+  app.post("/api/files/:id/clean/preview", async (req, res) => {
+    try {
+      const fileId = parseInt(req.params.id);
+      const options = cleaningOptionsSchema.parse(req.body.cleaningOptions || req.body);
+
+      const file = await storage.getCsvFile(fileId);
+      if (!file) {
+        return res.status(404).json({ error: "File not found" });
+      }
+
+      const processedData = await storage.getProcessedDataMeta(fileId);
+      if (!processedData) {
+        return res.status(404).json({ error: "No data found for file" });
+      }
+
+      const filePath = path.join(uploadsDir, file.filename);
+      const pythonResult = await processCsvWithPython(filePath, 'preview', {
+        cleaningOptions: options,
+        jsonConfig: processedData.jsonExtractionConfig,
+        sampleSize: req.body.sampleSize,
+      });
+
+      if (!pythonResult.success) {
+        return res.status(400).json({ error: pythonResult.error });
+      }
+
+      res.json({
+        preview: pythonResult.data.preview,
+        stats: pythonResult.data.stats,
+        cleaningReport: pythonResult.data.cleaningReport,
+        sample: pythonResult.data.sample,
+      });
+    } catch (error) {
+      console.error("Clean preview error:", error);
+      res.status(500).json({ error: "Failed to preview cleaning" });
+    }
+  });
+
   // Export data
   app.post("/api/files/:id/export", async (req, res) => {
     try {
       const fileId = parseInt(req.params.id);
-      const { format = 'csv', includeHeaders = true, includeMetadata = false, cleaningOptions } = req.body;
+      const { format = 'csv', includeHeaders = true, includeMetadata = false, cleaningOptions, sort, sqliteIndexes } = req.body;
 
       const file = await storage.getCsvFile(fileId);
       if (!file) {
         return res.status(404).json({ error: "File not found" });
       }
 
-      const processedData = await storage.getProcessedData(fileId);
+      const processedData = await storage.getProcessedDataMeta(fileId);
       if (!processedData) {
         return res.status(404).json({ error: "No data found for file" });
       }
@@ -209,29 +249,209 @@ export async function registerRoutes(app: Express): Promise<Server> {
         format,
         includeHeaders,
         includeMetadata,
+        sort: exportSortSchema.parse(sort ?? []),
         cleaningOptions: cleaningOptions || processedData.cleaningOptions,
         jsonConfig: processedData.jsonExtractionConfig,
+        // SQLite databases are written to a temp file and streamed back
+        outputPath: format === 'sqlite' ? path.join(tmpdir(), `export_${fileId}_${Date.now()}.sqlite`) : undefined,
+        sqliteIndexes: format === 'sqlite' ? z.array(z.string()).parse(sqliteIndexes ?? []) : undefined,
       };
-      
-      // Debug removed
 
       const pythonResult = await processCsvWithPython(filePath, 'export', exportOptions);
 
       if (!pythonResult.success) {
+        if (exportOptions.outputPath) {
+          fs.rm(exportOptions.outputPath, { force: true }, () => {});
+        }
         return res.status(400).json({ error: pythonResult.error });
       }
 
       const exportFileName = `${file.originalName.replace('.csv', '')}_cleaned.${format}`;
+
+      if (format === 'sqlite') {
+        const exportPath = pythonResult.data.exportPath;
+        res.setHeader('Content-Type', getContentType(format));
+        return res.download(exportPath, exportFileName, (err) => {
+          if (err) {
+            console.error("SQLite export send error:", err);
+          }
+          fs.rm(exportPath, { force: true }, () => {});
+        });
+      }
       
       res.setHeader('Content-Disposition', `attachment; filename="${exportFileName}"`);
       res.setHeader('Content-Type', getContentType(format));
       res.send(pythonResult.data.exportData);
     } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ error: "Invalid export request", details: error.errors });
+      }
       console.error("Export error:", error);
       res.status(500).json({ error: "Failed to export data" });
     }
   });
 
+  // Read-only SQL over the uploaded file (table name: data)
+  app.post("/api/files/:id/query", async (req, res) => {
+    try {
+      const fileId = parseInt(req.params.id);
+      const { sql, limit, timeoutMs } = querySchema.parse(req.body);
+
+      const file = await storage.getCsvFile(fileId);
+      if (!file) {
+        return res.status(404).json({ error: "File not found" });
+      }
+
+      // The store is built on first query and reused until the file changes
+      const filePath = path.join(uploadsDir, file.filename);
+      const pythonResult = await processCsvWithPython(filePath, 'query', {
+        sql,
+        limit,
+        timeoutMs,
+        storePath: `${filePath}.sqlite`,
+      });
+
+      if (!pythonResult.success) {
+        return res.status(400).json({ error: pythonResult.error });
+      }
+
+      res.json(pythonResult.data);
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ error: "Invalid query request", details: error.errors });
+      }
+      console.error("Query error:", error);
+      res.status(500).json({ error: "Failed to run query" });
+    }
+  });
+
+  // Append the rows of another CSV with the same columns to an uploaded file
+  app.post("/api/files/:id/append", upload.single('file'), async (req, res) => {
+    try {
+      if (!req.file) {
+        return res.status(400).json({ error: "No file uploaded" });
+      }
+      const appendPath = req.file.path;
+
+      try {
+        if (!req.file.originalname.toLowerCase().endsWith('.csv')) {
+          return res.status(400).json({ error: "Only CSV files are allowed" });
+        }
+
+        const fileId = parseInt(req.params.id);
+        const file = await storage.getCsvFile(fileId);
+        if (!file) {
+          return res.status(404).json({ error: "File not found" });
+        }
+
+        // Only the new rows are parsed; stats and the query store are updated in place
+        const filePath = path.join(uploadsDir, file.filename);
+        const pythonResult = await runExclusive(fileId, () => processCsvWithPython(filePath, 'append', {
+          appendPath,
+          statsPath: `${filePath}.stats.json`,
+          storePath: `${filePath}.sqlite`,
+        }));
+
+        if (!pythonResult.success) {
+          return res.status(400).json({ error: pythonResult.error });
+        }
+
+        const updatedFile = await storage.updateCsvFile(fileId, {
+          size: fs.statSync(filePath).size,
+          rows: pythonResult.data.rows,
+          jsonColumns: pythonResult.data.jsonColumns || [],
+        });
+
+        // Flatten/clean results covered the old rows only; keep the options so they can be re-applied
+        const processedData = await storage.getProcessedDataMeta(fileId);
+        if (processedData) {
+          await storage.updateProcessedData(processedData.id, {
+            originalData: pythonResult.data.preview,
+            processedData: null,
+          });
+        }
+
+        res.json({
+          file: updatedFile,
+          preview: pythonResult.data.preview,
+          stats: pythonResult.data.stats,
+          jsonColumns: pythonResult.data.jsonColumns,
+          jsonFields: pythonResult.data.jsonFields,
+          distributions: pythonResult.data.distributions,
+          numericSummary: pythonResult.data.numericSummary,
+          append: pythonResult.data.append,
+        });
+      } finally {
+        fs.rm(appendPath, { force: true }, () => {});
+      }
+    } catch (error) {
+      console.error("Append error:", error);
+      res.status(500).json({ error: "Failed to append data" });
+    }
+  });
+
+  // Join another uploaded file onto this one; the result is stored as a new file
+  app.post("/api/files/:id/join", async (req, res) => {
+    try {
+      const fileId = parseInt(req.params.id);
+      const { rightFileId, keys, how, ignoreCase, memoryBudgetMb } = joinSchema.parse(req.body);
+
+      const file = await storage.getCsvFile(fileId);
+      const rightFile = await storage.getCsvFile(rightFileId);
+      if (!file || !rightFile) {
+        return res.status(404).json({ error: "File not found" });
+      }
+
+      const filePath = path.join(uploadsDir, file.filename);
+      const outputName = `join_${fileId}_${rightFileId}_${Date.now()}`;
+      const outputPath = path.join(uploadsDir, outputName);
+      const pythonResult = await processCsvWithPython(filePath, 'join', {
+        rightPath: path.join(uploadsDir, rightFile.filename),
+        outputPath,
+        keys,
+        how,
+        ignoreCase,
+        memoryBudgetMb,
+      });
+
+      if (!pythonResult.success) {
+        fs.rm(outputPath, { force: true }, () => {});
+        return res.status(400).json({ error: pythonResult.error });
+      }
+
+      const joinedFile = await storage.createCsvFile({
+        filename: outputName,
+        originalName: `${file.originalName.replace('.csv', '')}_${rightFile.originalName.replace('.csv', '')}_joined.csv`,
+        size: fs.statSync(outputPath).size,
+        rows: pythonResult.data.rows,
+        columns: pythonResult.data.columns,
+        jsonColumns: pythonResult.data.jsonColumns || [],
+      });
+
+      await storage.createProcessedData({
+        fileId: joinedFile.id,
+        originalData: pythonResult.data.preview,
+        processedData: null,
+        cleaningOptions: null,
+        jsonExtractionConfig: null,
+      });
+
+      res.json({
+        file: joinedFile,
+        preview: pythonResult.data.preview,
+        stats: pythonResult.data.stats,
+        jsonColumns: pythonResult.data.jsonColumns,
+        cleaningReport: pythonResult.data.cleaningReport,
+      });
+    } catch (error) {
+      if (error instanceof z.ZodError) {
+        return res.status(400).json({ error: "Invalid join request", details: error.errors });
+      }
+      console.error("Join error:", error);
+      res.status(500).json({ error: "Failed to join files" });
+    }
+  });
+
   // Chat with data assistant
   app.post("/api/files/:id/chat", async (req, res) => {
     try {
@@ -243,7 +463,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         return res.status(404).json({ error: "File not found" });
       }
 
-      const processedData = await storage.getProcessedData(fileId);
+      const processedData = await storage.getProcessedDataMeta(fileId);
       if (!processedData) {
         return res.status(404).json({ error: "No data found for file" });
       }
@@ -302,11 +522,100 @@ Once the API key is configured, I'll be able to provide detailed insights about
     }
   });
 
+  // Processed-data cache counters
+  app.get("/api/storage/stats", async (req, res) => {
+    if (!(storage instanceof DiskStorage)) {
+      return res.json({ backend: "memory" });
+    }
+    res.json({ backend: "disk", cache: storage.getCacheStats() });
+  });
+
+  // Processing-tier metrics in the Prometheus text format
+  app.get("/api/metrics", (req, res) => {
+    collectServerMetrics();
+    res.setHeader('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+    res.send(registry.render());
+  });
+
   const httpServer = createServer(app);
   return httpServer;
 }
 
+// Python processor concurrency; further requests wait in a FIFO queue
+const maxPythonProcesses = Math.max(1, parseInt(process.env.PYTHON_MAX_CONCURRENCY || String(cpus().length), 10));
+const processSlotQueue: Array<() => void> = [];
+let activePythonProcesses = 0;
+
+// Stderr kept per run for error messages; only the tail is retained
+const STDERR_CAPTURE_LIMIT = 64 * 1024;
+
+async function acquireProcessSlot(): Promise<void> {
+  if (activePythonProcesses < maxPythonProcesses) {
+    activePythonProcesses++;
+  } else {
+    // The releasing run hands its slot straight to the next waiter
+    await new Promise<void>((resolve) => {
+      processSlotQueue.push(resolve);
+      processorMetrics.queueDepth.set({}, processSlotQueue.length);
+    });
+    processorMetrics.queueDepth.set({}, processSlotQueue.length);
+  }
+  processorMetrics.activeProcesses.set({}, activePythonProcesses);
+}
+
+function releaseProcessSlot(): void {
+  const next = processSlotQueue.shift();
+  if (next) {
+    next();
+  } else {
+    activePythonProcesses--;
+  }
+  processorMetrics.activeProcesses.set({}, activePythonProcesses);
+}
+
+// Appends to one file run one at a time so their rows and stats updates don't interleave
+const appendQueues = new Map<number, Promise<unknown>>();
+
+function runExclusive<T>(fileId: number, task: () => Promise<T>): Promise<T> {
+  const previous = appendQueues.get(fileId) ?? Promise.resolve();
+  const run = previous.then(task, task);
+  const settled = run.catch(() => undefined);
+  appendQueues.set(fileId, settled);
+  settled.then(() => {
+    if (appendQueues.get(fileId) === settled) appendQueues.delete(fileId);
+  });
+  return run;
+}
+
+// Row count of a processor result, when the operation returns one
+function countResultRows(data: any): number | undefined {
+  const processed = data?.processedData;
+  if (processed) {
+    return Array.isArray(processed) ? processed.length : processed.rows?.length;
+  }
+  if (typeof data?.rows === 'number') {
+    return data.rows;
+  }
+  return data?.cleaningReport?.summary?.final_rows;
+}
+
+// Python reports handled errors as a JSON object on stderr before exiting with code 1
+function classifyFailure(code: number | null, signal: NodeJS.Signals | null, stderr: string): string {
+  if (signal) return 'killed';
+  if (code === 1 && stderr.trimStart().startsWith('{"error"')) return 'processing_error';
+  return 'crash';
+}
+
 async function processCsvWithPython(filePath: string, operation: string, options?: any): Promise<{ success: boolean; data?: any; error?: string }> {
+  const queuedAt = performance.now();
+  await acquireProcessSlot();
+  processorMetrics.queueWait.observe({ operation }, (performance.now() - queuedAt) / 1000);
+
+  const inputBytes = await fs.promises.stat(filePath).then((stats) => stats.size, () => undefined);
+  if (inputBytes !== undefined) {
+    processorMetrics.inputBytes.observe({ operation }, inputBytes);
+  }
+
   return new Promise((resolve) => {
     // Handle both development and production paths
     const isDev = process.env.NODE_ENV === 'development';
@@ -318,42 +627,105 @@ async function processCsvWithPython(filePath: string, operation: string, options
     if (options) {
       args.push(JSON.stringify(options));
     }
+    // Compact framed output; set PYTHON_WIRE_FORMAT=json for the legacy single JSON document
+    const wireFormat = process.env.PYTHON_WIRE_FORMAT === 'json' ? 'json' : 'frames';
+    args.push(`--wire-format=${wireFormat}`);
 
     // Try different Python executables for different environments
     const pythonCmd = process.env.NODE_ENV === 'production' ? 'python3' : 'python3';
     
-    console.log(`Executing: ${pythonCmd} ${args.join(' ')}`);
-    console.log(`Python script path: ${pythonScript}`);
-    console.log(`File path: ${filePath}`);
-    
+    const startedAt = performance.now();
     const python = spawn(pythonCmd, args);
-    let output = '';
+    const decoder = new FrameDecoder();
+    const outputChunks: Buffer[] = [];
+    let outputBytes = 0;
+    let decodeError: Error | null = null;
     let errorOutput = '';
+    let settled = false;
+
+    const finish = (result: { success: boolean; data?: any; error?: string }, fields: Record<string, unknown>) => {
+      if (settled) return;
+      settled = true;
+      releaseProcessSlot();
+
+      const seconds = (performance.now() - startedAt) / 1000;
+      const status = result.success ? 'success' : 'failure';
+      processorMetrics.duration.observe({ operation, status }, seconds);
+      processorMetrics.outputBytes.inc({ operation }, outputBytes);
+
+      const rows = result.success ? countResultRows(result.data) : undefined;
+      if (rows !== undefined) {
+        processorMetrics.rows.observe({ operation }, rows);
+      }
+      const peakRssBytes = wireFormat === 'frames' && decoder.isComplete() ? decoder.stats().peakRssBytes : undefined;
+      if (typeof peakRssBytes === 'number') {
+        processorMetrics.workerPeakRss.observe({ operation }, peakRssBytes);
+        processorMetrics.workerPeakRssMax.setMax({}, peakRssBytes);
+      }
+      if (typeof fields.cause === 'string') {
+        processorMetrics.failures.inc({ operation, cause: fields.cause });
+      }
 
-    python.stdout.on('data', (data) => {
-      output += data.toString();
+      logEvent('python_process', {
+        operation,
+        file: path.basename(filePath),
+        status,
+        durationMs: Math.round(seconds * 1000),
+        inputBytes,
+        outputBytes,
+        rows,
+        peakRssBytes,
+        ...fields,
+      }, result.success ? 'info' : 'error');
+      resolve(result);
+    };
+
+    python.stdout.on('data', (data: Buffer) => {
+      outputBytes += data.length;
+      if (wireFormat === 'json') {
+        outputChunks.push(data);
+        return;
+      }
+      if (decodeError) return;
+      try {
+        decoder.push(data);
+      } catch (error) {
+        decodeError = error as Error;
+      }
     });
 
     python.stderr.on('data', (data) => {
       errorOutput += data.toString();
-      console.error('Python stderr:', data.toString());
+      if (errorOutput.length > STDERR_CAPTURE_LIMIT) {
+        errorOutput = errorOutput.slice(-STDERR_CAPTURE_LIMIT);
+      }
     });
 
-    python.on('close', (code) => {
-      console.log(`Python script exited with code ${code}`);
-      console.log(`Python stdout: ${output}`);
-      console.log(`Python stderr: ${errorOutput}`);
-      
+    python.on('error', (error) => {
+      finish({ success: false, error: `Failed to start Python: ${error.message}` }, { cause: 'spawn_error', error: error.message });
+    });
+
+    python.on('close', (code, signal) => {
       if (code === 0) {
         try {
-          const result = JSON.parse(output);
-          resolve({ success: true, data: result });
+          if (wireFormat === 'json') {
+            const output = Buffer.concat(outputChunks).toString('utf-8');
+            finish({ success: true, data: JSON.parse(output) }, { exitCode: code });
+            return;
+          }
+          if (decodeError) throw decodeError;
+          finish({ success: true, data: decoder.result() }, { exitCode: code });
         } catch (error) {
-          console.error('Failed to parse Python output:', error);
-          resolve({ success: false, error: `Failed to parse Python output: ${output}` });
+          finish(
+            { success: false, error: `Failed to parse Python output: ${error}` },
+            { cause: 'decode_error', exitCode: code, error: String(error) },
+          );
         }
       } else {
-        resolve({ success: false, error: errorOutput || `Python script failed with code ${code}` });
+        finish(
+          { success: false, error: errorOutput || `Python script failed with code ${code}` },
+          { cause: classifyFailure(code, signal, errorOutput), exitCode: code, signal, stderr: errorOutput },
+        );
       }
     });
   });
@@ -364,6 +736,7 @@ function getContentType(format: string): string {
     case 'csv': return 'text/csv';
     case 'xlsx': return 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet';
     case 'json': return 'application/json';
+    case 'sqlite': return 'application/vnd.sqlite3';
     default: return 'application/octet-stream';
   }
 }
@@ -6,21 +6,37 @@ import {
   type ProcessedData, 
   type InsertProcessedData 
 } from "@shared/schema";
+import { promises as fsp, mkdirSync, readdirSync, rmSync } from "fs";
+import path from "path";
+import { tmpdir } from "os";
 
 export interface IStorage {
   // CSV Files
   createCsvFile(file: InsertCsvFile): Promise<CsvFile>;
   getCsvFile(id: number): Promise<CsvFile | undefined>;
   getAllCsvFiles(): Promise<CsvFile[]>;
+  updateCsvFile(id: number, file: Partial<InsertCsvFile>): Promise<CsvFile | undefined>;
   deleteCsvFile(id: number): Promise<void>;
 
   // Processed Data
   createProcessedData(data: InsertProcessedData): Promise<ProcessedData>;
   getProcessedData(fileId: number): Promise<ProcessedData | undefined>;
+  // Same record without loading the dataset (processedData is null)
+  getProcessedDataMeta(fileId: number): Promise<ProcessedData | undefined>;
   updateProcessedData(id: number, data: Partial<InsertProcessedData>): Promise<ProcessedData | undefined>;
   deleteProcessedData(id: number): Promise<void>;
 }
 
+export interface CacheStats {
+  hits: number;
+  misses: number;
+  evictions: number;
+  hitRate: number;
+  entries: number;
+  bytesInMemory: number;
+  budgetBytes: number;
+}
+
 export class MemStorage implements IStorage {
   private csvFiles: Map<number, CsvFile>;
   private processedData: Map<number, ProcessedData>;
@@ -54,6 +70,18 @@ export class MemStorage implements IStorage {
     return Array.from(this.csvFiles.values());
   }
 
+  async updateCsvFile(id: number, updateFile: Partial<InsertCsvFile>): Promise<CsvFile | undefined> {
+    const existing = this.csvFiles.get(id);
+    if (!existing) return undefined;
+
+    const updated: CsvFile = {
+      ...existing,
+      ...updateFile,
+    };
+    this.csvFiles.set(id, updated);
+    return updated;
+  }
+
   async deleteCsvFile(id: number): Promise<void> {
     this.csvFiles.delete(id);
     // Also delete associated processed data
@@ -82,6 +110,11 @@ export class MemStorage implements IStorage {
     return Array.from(this.processedData.values()).find(data => data.fileId === fileId);
   }
 
+  async getProcessedDataMeta(fileId: number): Promise<ProcessedData | undefined> {
+    const data = await this.getProcessedData(fileId);
+    return data && { ...data, processedData: null };
+  }
+
   async updateProcessedData(id: number, updateData: Partial<InsertProcessedData>): Promise<ProcessedData | undefined> {
     const existing = this.processedData.get(id);
     if (!existing) return undefined;
@@ -99,4 +132,257 @@ export class MemStorage implements IStorage {
   }
 }
 
-export const storage = new MemStorage();
+interface CacheEntry {
+  data: unknown;
+  bytes: number;
+}
+
+// Keeps file and processed-data metadata in memory (indexed by fileId) and
+// spills the large processedData arrays to disk. Recently used datasets are
+// kept in an in-memory LRU bounded by a byte budget.
+export class DiskStorage implements IStorage {
+  private csvFiles: Map<number, CsvFile>;
+  private processedData: Map<number, ProcessedData>;
+  private processedDataByFileId: Map<number, number>;
+  private cache: Map<number, CacheEntry>;
+  private cacheBytes: number;
+  // Bumped on every write so a read started earlier never caches stale data
+  private generations: Map<number, number>;
+  private hits: number;
+  private misses: number;
+  private evictions: number;
+  private currentCsvFileId: number;
+  private currentProcessedDataId: number;
+
+  constructor(
+    private dataDir: string,
+    private budgetBytes: number,
+  ) {
+    this.csvFiles = new Map();
+    this.processedData = new Map();
+    this.processedDataByFileId = new Map();
+    this.cache = new Map();
+    this.cacheBytes = 0;
+    this.generations = new Map();
+    this.hits = 0;
+    this.misses = 0;
+    this.evictions = 0;
+    this.currentCsvFileId = 1;
+    this.currentProcessedDataId = 1;
+    mkdirSync(dataDir, { recursive: true });
+    // IDs restart at 1, so datasets left by an earlier run would be served as new ones
+    for (const name of readdirSync(dataDir)) {
+      if (/^processed_\d+\.json(\.\d+\.tmp)?$/.test(name)) {
+        rmSync(path.join(dataDir, name), { force: true });
+      }
+    }
+  }
+
+  async createCsvFile(insertFile: InsertCsvFile): Promise<CsvFile> {
+    const id = this.currentCsvFileId++;
+    const file: CsvFile = {
+      ...insertFile,
+      id,
+      uploadedAt: new Date(),
+      jsonColumns: insertFile.jsonColumns || [],
+    };
+    this.csvFiles.set(id, file);
+    return file;
+  }
+
+  async getCsvFile(id: number): Promise<CsvFile | undefined> {
+    return this.csvFiles.get(id);
+  }
+
+  async getAllCsvFiles(): Promise<CsvFile[]> {
+    return Array.from(this.csvFiles.values());
+  }
+
+  async updateCsvFile(id: number, updateFile: Partial<InsertCsvFile>): Promise<CsvFile | undefined> {
+    const existing = this.csvFiles.get(id);
+    if (!existing) return undefined;
+
+    const updated: CsvFile = {
+      ...existing,
+      ...updateFile,
+    };
+    this.csvFiles.set(id, updated);
+    return updated;
+  }
+
+  async deleteCsvFile(id: number): Promise<void> {
+    this.csvFiles.delete(id);
+    // Also delete associated processed data
+    const processedDataId = this.processedDataByFileId.get(id);
+    if (processedDataId !== undefined) {
+      await this.deleteProcessedData(processedDataId);
+    }
+  }
+
+  async createProcessedData(insertData: InsertProcessedData): Promise<ProcessedData> {
+    const id = this.currentProcessedDataId++;
+    const data: ProcessedData = {
+      ...insertData,
+      id,
+      createdAt: new Date(),
+      processedData: insertData.processedData || null,
+      cleaningOptions: insertData.cleaningOptions || null,
+      jsonExtractionConfig: insertData.jsonExtractionConfig || null,
+    };
+    await this.writeDataset(id, data.processedData);
+    this.processedData.set(id, { ...data, processedData: null });
+    // Keep the first record per file, matching MemStorage lookup semantics
+    if (!this.processedDataByFileId.has(data.fileId)) {
+      this.processedDataByFileId.set(data.fileId, id);
+    }
+    return data;
+  }
+
+  async getProcessedData(fileId: number): Promise<ProcessedData | undefined> {
+    const id = this.processedDataByFileId.get(fileId);
+    if (id === undefined) return undefined;
+    const meta = this.processedData.get(id);
+    if (!meta) return undefined;
+    return { ...meta, processedData: await this.readDataset(id) };
+  }
+
+  async getProcessedDataMeta(fileId: number): Promise<ProcessedData | undefined> {
+    const id = this.processedDataByFileId.get(fileId);
+    if (id === undefined) return undefined;
+    const meta = this.processedData.get(id);
+    return meta && { ...meta };
+  }
+
+  async updateProcessedData(id: number, updateData: Partial<InsertProcessedData>): Promise<ProcessedData | undefined> {
+    const existing = this.processedData.get(id);
+    if (!existing) return undefined;
+
+    const { processedData: dataset, ...metadata } = updateData;
+    const updated: ProcessedData = {
+      ...existing,
+      ...metadata,
+    };
+    if (updateData.fileId !== undefined && updateData.fileId !== existing.fileId) {
+      if (this.processedDataByFileId.get(existing.fileId) === id) {
+        this.processedDataByFileId.delete(existing.fileId);
+      }
+      this.processedDataByFileId.set(updated.fileId, id);
+    }
+    if (dataset !== undefined) {
+      await this.writeDataset(id, dataset);
+    }
+    this.processedData.set(id, updated);
+    // A dataset passed in is returned as is rather than read back from disk
+    return { ...updated, processedData: dataset !== undefined ? dataset : await this.readDataset(id) };
+  }
+
+  async deleteProcessedData(id: number): Promise<void> {
+    const existing = this.processedData.get(id);
+    if (existing && this.processedDataByFileId.get(existing.fileId) === id) {
+      this.processedDataByFileId.delete(existing.fileId);
+    }
+    this.processedData.delete(id);
+    await this.writeDataset(id, null);
+  }
+
+  getCacheStats(): CacheStats {
+    const lookups = this.hits + this.misses;
+    return {
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+      hitRate: lookups > 0 ? this.hits / lookups : 0,
+      entries: this.cache.size,
+      bytesInMemory: this.cacheBytes,
+      budgetBytes: this.budgetBytes,
+    };
+  }
+
+  private datasetPath(id: number): string {
+    return path.join(this.dataDir, `processed_${id}.json`);
+  }
+
+  private async writeDataset(id: number, dataset: unknown): Promise<void> {
+    const generation = (this.generations.get(id) ?? 0) + 1;
+    this.generations.set(id, generation);
+    this.dropFromCache(id);
+    if (dataset === null || dataset === undefined) {
+      await fsp.rm(this.datasetPath(id), { force: true });
+      return;
+    }
+    const serialized = JSON.stringify(dataset);
+    // Write then rename so concurrent readers never see a partial file
+    const tmpPath = `${this.datasetPath(id)}.${generation}.tmp`;
+    await fsp.writeFile(tmpPath, serialized);
+    // A newer write or delete started meanwhile; it owns the file and the cache entry
+    if (this.generations.get(id) !== generation) {
+      await fsp.rm(tmpPath, { force: true });
+      return;
+    }
+    await fsp.rename(tmpPath, this.datasetPath(id));
+    if (this.generations.get(id) === generation) {
+      this.addToCache(id, dataset, Buffer.byteLength(serialized));
+    }
+  }
+
+  private async readDataset(id: number): Promise<unknown> {
+    const cached = this.cache.get(id);
+    if (cached) {
+      // Re-insert to mark as most recently used
+      this.cache.delete(id);
+      this.cache.set(id, cached);
+      this.hits++;
+      return cached.data;
+    }
+
+    this.misses++;
+    const generation = this.generations.get(id) ?? 0;
+    let serialized: string;
+    try {
+      serialized = await fsp.readFile(this.datasetPath(id), "utf-8");
+    } catch (err: any) {
+      if (err.code === "ENOENT") return null;
+      throw err;
+    }
+    const dataset = JSON.parse(serialized);
+    // A write that landed while the file was being read owns the cache entry
+    if (this.generations.get(id) === generation) {
+      this.addToCache(id, dataset, Buffer.byteLength(serialized));
+    }
+    return dataset;
+  }
+
+  private addToCache(id: number, data: unknown, bytes: number): void {
+    this.dropFromCache(id);
+    // Datasets larger than the whole budget are served from disk only
+    if (bytes > this.budgetBytes) return;
+    this.cache.set(id, { data, bytes });
+    this.cacheBytes += bytes;
+    for (const [key, entry] of Array.from(this.cache.entries())) {
+      if (this.cacheBytes <= this.budgetBytes) break;
+      this.cache.delete(key);
+      this.cacheBytes -= entry.bytes;
+      this.evictions++;
+    }
+  }
+
+  private dropFromCache(id: number): void {
+    const entry = this.cache.get(id);
+    if (entry) {
+      this.cache.delete(id);
+      this.cacheBytes -= entry.bytes;
+    }
+  }
+}
+
+function createStorage(): IStorage {
+  if (process.env.STORAGE_BACKEND === "memory") {
+    return new MemStorage();
+  }
+  const dataDir = process.env.PROCESSED_DATA_DIR
+    || (process.env.NODE_ENV === "production" ? path.join(tmpdir(), "processed") : "processed");
+  const budgetMb = parseInt(process.env.PROCESSED_DATA_CACHE_MB || "256", 10);
+  return new DiskStorage(dataDir, budgetMb * 1024 * 1024);
+}
+
+export const storage = createStorage();
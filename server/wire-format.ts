@@ -0,0 +1,94 @@
+// Decoder for the compact wire format written by simple_csv_processor.py
+// with --wire-format=frames. Each frame is a 1-byte type, a 4-byte
+// big-endian payload length and a UTF-8 JSON payload:
+//   M  result metadata (every key except the processed rows)
+//   R  a batch of row arrays, ordered by meta.processedDataColumns
+//   E  end of stream; payload holds process stats such as peakRssBytes
+
+const HEADER_SIZE = 5;
+
+export interface ColumnarData {
+  columns: string[];
+  rows: unknown[][];
+}
+
+export class FrameDecoder {
+  private buffer: Buffer = Buffer.alloc(0);
+  private pending: Buffer[] = [];
+  private pendingBytes = 0;
+  private needed = HEADER_SIZE;
+  private meta: Record<string, any> | null = null;
+  private rows: unknown[][] = [];
+  private ended = false;
+  private trailer: Record<string, any> = {};
+  bytesReceived = 0;
+
+  // Decode every complete frame in the chunk; partial frames are kept
+  // until the rest of their bytes arrive.
+  push(chunk: Buffer): void {
+    this.bytesReceived += chunk.length;
+    // Avoid re-copying a large partially received frame on every chunk
+    this.pending.push(chunk);
+    this.pendingBytes += chunk.length;
+    if (this.buffer.length + this.pendingBytes < this.needed) return;
+    this.buffer = Buffer.concat([this.buffer, ...this.pending]);
+    this.pending = [];
+    this.pendingBytes = 0;
+
+    let offset = 0;
+    this.needed = HEADER_SIZE;
+    while (this.buffer.length - offset >= HEADER_SIZE) {
+      const type = String.fromCharCode(this.buffer[offset]);
+      const length = this.buffer.readUInt32BE(offset + 1);
+      if (this.buffer.length - offset - HEADER_SIZE < length) {
+        this.needed = HEADER_SIZE + length;
+        break;
+      }
+
+      const start = offset + HEADER_SIZE;
+      const payload = this.buffer.toString("utf-8", start, start + length);
+      offset = start + length;
+
+      switch (type) {
+        case "M":
+          this.meta = JSON.parse(payload);
+          break;
+        case "R":
+          for (const row of JSON.parse(payload)) {
+            this.rows.push(row);
+          }
+          break;
+        case "E":
+          this.ended = true;
+          this.trailer = length > 0 ? JSON.parse(payload) : {};
+          break;
+        default:
+          throw new Error(`Unknown frame type: ${type}`);
+      }
+    }
+    this.buffer = this.buffer.subarray(offset);
+  }
+
+  isComplete(): boolean {
+    return this.ended && this.meta !== null && this.buffer.length === 0 && this.pendingBytes === 0;
+  }
+
+  // Process stats from the end frame (e.g. peakRssBytes)
+  stats(): Record<string, any> {
+    return this.trailer;
+  }
+
+  // Assemble the decoded result; processed rows are returned in columnar
+  // form ({ columns, rows }) rather than one object per row.
+  result(): Record<string, any> {
+    if (!this.isComplete()) {
+      throw new Error("Incomplete frame stream");
+    }
+    const { processedDataColumns, ...meta } = this.meta!;
+    if (processedDataColumns) {
+      const processedData: ColumnarData = { columns: processedDataColumns, rows: this.rows };
+      return { ...meta, processedData };
+    }
+    return meta;
+  }
+}
@@ -74,6 +74,54 @@ export const cleaningOptionsSchema = z.object({
     removePunctuation: false,
     specificColumns: [],
   }),
+  dateNormalization: z.object({
+    enabled: z.boolean().default(false),
+    columns: z.array(z.string()).default([]),
+    outputFormat: z.string().optional(),
+    dayFirst: z.boolean().default(false),
+    invalidValues: z.enum(['keep', 'empty']).default('keep'),
+  }).default({
+    enabled: false,
+    columns: [],
+    dayFirst: false,
+    invalidValues: 'keep',
+  }),
+  categoryNormalization: z.object({
+    enabled: z.boolean().default(false),
+    columns: z.array(z.string()).default([]),
+    similarity: z.number().min(0.5).max(1).default(0.85),
+    timeBudgetSeconds: z.number().positive().default(30),
+  }).default({
+    enabled: false,
+    columns: [],
+    similarity: 0.85,
+    timeBudgetSeconds: 30,
+  }),
+  deduplication: z.object({
+    enabled: z.boolean().default(false),
+    columns: z.array(z.string()).default([]),
+    keep: z.enum(['first', 'last']).default('first'),
+    ignoreCase: z.boolean().default(false),
+    memoryBudgetMb: z.number().positive().default(64),
+  }).default({
+    enabled: false,
+    columns: [],
+    keep: 'first',
+    ignoreCase: false,
+    memoryBudgetMb: 64,
+  }),
+  outliers: z.object({
+    enabled: z.boolean().default(false),
+    method: z.enum(['iqr', 'zscore']).default('iqr'),
+    threshold: z.number().positive().optional(),
+    strategy: z.enum(['flag', 'clip', 'drop']).default('flag'),
+    columns: z.array(z.string()).default([]),
+  }).default({
+    enabled: false,
+    method: 'iqr',
+    strategy: 'flag',
+    columns: [],
+  }),
   filtering: z.object({
     removeEmptyRows: z.boolean().default(false),
     columnFilter: z.object({
@@ -111,5 +159,31 @@ export const jsonExtractionConfigSchema = z.object({
   })),
 });
 
+export const exportSortSchema = z.array(z.object({
+  column: z.string(),
+  direction: z.enum(['asc', 'desc']).default('asc'),
+  type: z.enum(['auto', 'numeric', 'text']).default('auto'),
+}));
+
+export const querySchema = z.object({
+  sql: z.string().min(1),
+  limit: z.number().int().positive().max(10000).default(1000),
+  timeoutMs: z.number().int().positive().max(60000).default(5000),
+});
+
+export const joinSchema = z.object({
+  rightFileId: z.number().int().positive(),
+  keys: z.array(z.object({
+    left: z.string(),
+    right: z.string(),
+  })).min(1),
+  how: z.enum(['inner', 'left']).default('left'),
+  ignoreCase: z.boolean().default(false),
+  memoryBudgetMb: z.number().positive().default(256),
+});
+
 export type CleaningOptions = z.infer<typeof cleaningOptionsSchema>;
 export type JsonExtractionConfig = z.infer<typeof jsonExtractionConfigSchema>;
+export type ExportSort = z.infer<typeof exportSortSchema>;
+export type QueryRequest = z.infer<typeof querySchema>;
+export type JoinRequest = z.infer<typeof joinSchema>;